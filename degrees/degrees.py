@@ -1,65 +1,122 @@
-import csv
+import argparse
+import math
 import sys
+from collections import deque
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import MoviesView, NamesView, PeopleView, normalize
+from ingest import ingest
+from landmarks import alt_search, load_landmarks
+from nameindex import (
+    build_name_index, choose, name_index_from_sections, name_index_sections
+)
+from paths import ShortestPathDAG, k_shortest_paths
+from snapshot import read_snapshot, signature, snapshot_path, write_snapshot
+from util import ParentPointers
 
 # Maps names to a set of corresponding person_ids
 names = {}
 
+# Integer-indexed CSR graph of people and movies
+graph = None
+
 # Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
 people = {}
 
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Exact, prefix and fuzzy lookups of people by name
+name_index = None
+
+# Landmark distance tables bounding separations, if loaded
+landmarks = None
+
 
-def load_data(directory):
+def load_data(directory, cache=True, rebuild_cache=False, num_landmarks=0,
+              workers=1, spill_dir=None, progress=False):
     """
     Load data from CSV files into memory.
+
+    The CSV files are parsed by `ingest`, with star rows split across
+    `workers` processes and, given `spill_dir`, sorted on disk there.
+
+    With `cache`, a binary snapshot next to the CSV files is
+    memory-mapped instead when it matches their size and mtime, and
+    is (re)written after parsing otherwise. `rebuild_cache` forces
+    the CSV files to be parsed again.
+
+    The name index is built alongside the graph and cached with it.
+
+    With `num_landmarks`, also loads (or precomputes and saves) that
+    many landmark distance tables.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+    global graph, names, people, movies, name_index, landmarks
+
+    loaded = None
+    if cache:
+        current = signature(directory)
+        if not rebuild_cache:
+            loaded, sections = read_snapshot(snapshot_path(directory), current)
+    if loaded is None:
+        loaded = ingest(directory, workers, spill_dir, progress)
+        name_index = build_name_index(loaded)
+        if cache:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+                write_snapshot(
+                    snapshot_path(directory), loaded, current,
+                    extra=name_index_sections(name_index)
+                )
+            except OSError as e:
+                print(f"Could not write snapshot: {e}", file=sys.stderr)
+    else:
+        name_index = name_index_from_sections(loaded, sections)
+
+    graph = loaded
+    names = NamesView(graph)
+    people = PeopleView(graph)
+    movies = MoviesView(graph)
+
+    landmarks = None
+    if num_landmarks:
+        landmarks = load_landmarks(
+            directory, graph, signature(directory), num_landmarks,
+            rebuild=rebuild_cache
+        )
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [directory] [--rebuild-cache] [--no-cache] "
+              "[--landmarks K] [--workers N] [--spill DIR]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--rebuild-cache", action="store_true",
+        help="parse the CSV files even if a fresh snapshot exists"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="neither read nor write the binary snapshot"
+    )
+    parser.add_argument(
+        "--landmarks", type=int, default=0, metavar="K",
+        help="use K landmark distance tables to bound and prune searches"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes parsing stars.csv (default: 1)"
+    )
+    parser.add_argument(
+        "--spill", metavar="DIR",
+        help="sort star edges on disk in DIR instead of in memory"
+    )
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, cache=not args.no_cache,
+              rebuild_cache=args.rebuild_cache, num_landmarks=args.landmarks,
+              workers=args.workers, spill_dir=args.spill, progress=True)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +126,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=True)
 
     if path is None:
         print("Not connected.")
@@ -84,63 +141,241 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False):
     """
         Returns the shortest list of (movie_id, person_id) pairs
         that connect the source to the target.
         If no possible path, returns None.
+
+        With `bidirectional`, searches from both ends at once
+        instead of breadth-first from the source only. When landmarks
+        are loaded, pairs they prove disconnected return at once and
+        either search skips people their bounds rule out: the
+        bidirectional one stops expanding them, and the one-sided
+        one becomes an A* search.
         """
-    start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
-    frontier.add(start)
-    explored = set()
-    while True:
-
-        # If nothing left in frontier, then no path
-        if frontier.empty():
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if landmarks is not None:
+        if landmarks.lower_bound(source, target) == math.inf:
             return None
+        if not bidirectional:
+            return ids_path(alt_search(graph, landmarks, source, target))
+    if bidirectional:
+        return ids_path(bidirectional_search(source, target, landmarks))
+
+    if source == target:
+        return []
+
+    # A person is explored or on the frontier once it has a parent
+    parents = ParentPointers(graph.num_people)
+    parents.add_root(source)
+    frontier = deque([source])
+    while frontier:
+        person = frontier.popleft()
+        for movie, neighbor in graph.neighbors(person):
+            if neighbor in parents:
+                continue
+            parents.add(neighbor, person, movie)
+            if neighbor == target:
+                return ids_path(parents.path(target))
+            frontier.append(neighbor)
+
+    # If nothing left in frontier, then no path
+    return None
+
+
+def ids_path(path):
+    """
+    Returns a (movie, person) index path as (movie_id, person_id) pairs.
+    """
+    if path is None:
+        return None
+    return [
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in path
+    ]
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connects the source to the target, one at a time.
+    """
+    dag = ShortestPathDAG(
+        graph, graph.person_index[source], graph.person_index[target]
+    )
+    for path in dag.paths():
+        yield ids_path(path)
+
+
+def count_shortest_paths(source, target):
+    """
+    Returns the number of shortest paths between two person_ids
+    without enumerating them.
+    """
+    return ShortestPathDAG(
+        graph, graph.person_index[source], graph.person_index[target]
+    ).count()
+
+
+def best_shortest_paths(source, target, k, weight=None):
+    """
+    Returns the `k` shortest paths with the lowest total `weight`,
+    a function of a movie_id, over their movies. By default the
+    paths through the most recent movies come first.
+    """
+    if weight is None:
+        cost = recency
+    else:
+        def cost(movie):
+            return weight(graph.movie_ids[movie])
+    dag = ShortestPathDAG(
+        graph, graph.person_index[source], graph.person_index[target]
+    )
+    return [ids_path(path) for path in dag.best(k, cost)]
 
-        # Choose a node from the frontier
-        node = frontier.remove()
 
-        # If node is the goal, then we have a solution
-        if node.state == target:
-            path = []
-            while node.parent is not None:
-                path.append((node.action, node.state))
-                node = node.parent
-            path.reverse()
-            return path
+def recency(movie):
+    """
+    Returns a weight for a movie index that is lower for more recent
+    movies.
+    """
+    year = graph.movie_years[movie]
+    return -int(year) if year.isdigit() else 0
 
-        # Mark node as explored
-        explored.add(node.state)
 
-        # Add neighbors to frontier
-        neighbors = neighbors_for_person(node.state)
-        for action, state in neighbors:
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state=state, parent=node, action=action)
-                if child.state == target:
-                    path = []
+def shortest_paths(source, target, k):
+    """
+    Yields up to `k` simple paths between two person_ids as lists of
+    (movie_id, person_id) pairs, shortest first.
+    """
+    for path in k_shortest_paths(
+        graph, graph.person_index[source], graph.person_index[target], k
+    ):
+        yield ids_path(path)
 
-                    while child.parent is not None:
-                        path.append((child.action, child.state))
-                        child = child.parent
 
-                    path.reverse()
-                    return path
-                frontier.add(child)
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two person_ids from the loaded landmarks, in time linear in their
+    number. Both bounds are math.inf for people known not to be connected.
+    """
+    return landmarks.bounds(
+        graph.person_index[source], graph.person_index[target]
+    )
 
 
-def person_id_for_name(name):
+def bidirectional_search(source, target, landmarks=None):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source index to the target index, or None.
+
+    Grows one breadth-first layer at a time from whichever side has
+    the smaller frontier; the first layer that touches the other
+    side's visited set yields a shortest path.
+
+    With `landmarks`, a person at depth d from one side is not
+    expanded when the landmarks prove them more than upper - d from
+    the other end, where upper bounds the whole separation: no
+    shortest path runs through them.
+    """
+    if source == target:
+        return []
+    upper = math.inf
+    if landmarks is not None:
+        upper = landmarks.bounds(source, target)[1]
+
+    # Each side records the (movie, person) step towards its own root
+    forward = ParentPointers(graph.num_people)
+    forward.add_root(source)
+    backward = ParentPointers(graph.num_people)
+    backward.add_root(target)
+    forward_frontier = [source]
+    backward_frontier = [target]
+    forward_depth = 0
+    backward_depth = 0
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_layer(
+                forward_frontier, forward, backward,
+                pruner(landmarks, target, upper - forward_depth)
+            )
+            forward_depth += 1
+        else:
+            backward_frontier, meeting = expand_layer(
+                backward_frontier, backward, forward,
+                pruner(landmarks, source, upper - backward_depth)
+            )
+            backward_depth += 1
+        if meeting is not None:
+            return join_halves(meeting, forward, backward)
+    return None
+
+
+def pruner(landmarks, goal, limit):
+    """
+    Returns a test keeping the people the landmarks allow within
+    `limit` of `goal`, or None if they cannot rule anyone out.
+    """
+    if landmarks is None or limit >= landmarks.radius:
+        return None
+    return lambda person: landmarks.within(person, goal, limit)
+
+
+def expand_layer(frontier, visited, other, keep=None):
+    """
+    Expands one breadth-first layer of `frontier`, recording parents
+    in `visited`, skipping people failing `keep`. Returns the next
+    layer and the first person also visited by the `other` side,
+    if any.
+    """
+    layer = []
+    for person in frontier:
+        if keep is not None and not keep(person):
+            continue
+        for movie, neighbor in graph.neighbors(person):
+            if neighbor in visited:
+                continue
+            visited.add(neighbor, person, movie)
+            if neighbor in other:
+                return layer, neighbor
+            layer.append(neighbor)
+    return layer, None
+
+
+def join_halves(meeting, forward, backward):
+    """
+    Returns the (movie, person) index path through `meeting` given
+    the parent pointers of a forward and a backward search.
+    """
+    path = forward.path(meeting)
+    person = meeting
+    while backward.parents[person] != person:
+        movie = backward.actions[person]
+        person = backward.parents[person]
+        path.append((movie, person))
+    return path
+
+
+def person_id_for_name(name, policy="ask"):
         """
         Returns the IMDB id for a person's name,
         resolving ambiguities as needed.
+
+        With the default "ask" policy ambiguities are resolved by
+        prompting; any other policy in nameindex.POLICIES picks
+        without asking, or returns None for "error".
         """
-        person_ids = list(names.get(name.lower(), set()))
+        person_ids = list(names.get(normalize(name), set()))
         if len(person_ids) == 0:
             return None
         elif len(person_ids) > 1:
+            if policy != "ask":
+                candidate = choose(name_index.exact(name), policy)
+                return None if candidate is None else candidate.person_id
             print(f"Which '{name}'?")
             for person_id in person_ids:
                 person = people[person_id]
@@ -158,17 +393,23 @@ def person_id_for_name(name):
             return person_ids[0]
 
 
+def candidates_for_name(name, limit=10):
+    """
+    Returns up to `limit` ranked Candidates for a full, partial or
+    misspelled name, each with its person_id, name and birth year.
+    """
+    return name_index.search(name, limit)
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    return {
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in graph.neighbors(graph.person_index[person_id])
+    }
 
 
 if __name__ == "__main__":
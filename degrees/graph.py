@@ -0,0 +1,323 @@
+"""
+Compact integer representation of the people/movies graph.
+
+Every person id and movie id is interned to a dense integer index, and
+the person -> movie and movie -> person adjacency is stored in CSR form:
+an `offsets` array with one entry per node (plus a sentinel) and a flat
+`indices` array, so the movies of person `p` are
+`person_movies[person_offsets[p]:person_offsets[p + 1]]`.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+
+
+def normalize(name):
+    """
+    Return `name` lower-cased with runs of whitespace collapsed.
+    """
+    return " ".join(name.lower().split())
+
+
+class Graph():
+    """
+    People and movies interned to dense integer indexes, joined by
+    CSR adjacency arrays in both directions.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_index=None, movie_index=None, name_order=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self._name_order = name_order
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    @property
+    def name_order(self):
+        """
+        Person indexes sorted by normalized name.
+        """
+        if self._name_order is None:
+            names = self.person_names
+            self._name_order = array("i", sorted(
+                range(self.num_people), key=lambda p: normalize(names[p])
+            ))
+        return self._name_order
+
+    def movies_of(self, person):
+        """
+        Return the movie indexes a person index starred in.
+        """
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Return the person indexes starring in a movie index.
+        """
+        offsets = self.movie_offsets
+        return self.movie_people[offsets[movie]:offsets[movie + 1]]
+
+    def degree(self, person):
+        """
+        Return the number of movies a person index starred in.
+        """
+        return self.person_offsets[person + 1] - self.person_offsets[person]
+
+    def neighbors(self, person):
+        """
+        Yield (movie, person) index pairs for people who starred
+        with a given person index, the person included.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_people[j]
+
+
+def graph_from_edges(person_ids, person_names, person_births,
+                     movie_ids, movie_titles, movie_years,
+                     edge_people, edge_movies):
+    """
+    Build a Graph from interned node tables and parallel arrays of
+    (person index, movie index) edges.
+    """
+    person_offsets, person_movies = csr(
+        len(person_ids), edge_people, edge_movies
+    )
+    movie_offsets, movie_people = csr(
+        len(movie_ids), edge_movies, edge_people
+    )
+    return Graph(
+        person_ids, person_names, person_births,
+        movie_ids, movie_titles, movie_years,
+        person_offsets, person_movies, movie_offsets, movie_people
+    )
+
+
+def csr(count, sources, targets):
+    """
+    Return (offsets, indices) arrays grouping `targets` by `sources`,
+    with each row sorted and free of duplicates.
+    """
+    offsets = array("i", bytes(4 * (count + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    indices = array("i", bytes(4 * len(targets)))
+    fill = array("i", offsets)
+    for source, target in zip(sources, targets):
+        indices[fill[source]] = target
+        fill[source] += 1
+
+    # Sort each row and squeeze out duplicate edges in place
+    write = 0
+    start = 0
+    for i in range(count):
+        end = offsets[i + 1]
+        row = sorted(set(indices[start:end]))
+        offsets[i] = write
+        indices[write:write + len(row)] = array("i", row)
+        write += len(row)
+        start = end
+    offsets[count] = write
+    del indices[write:]
+    return offsets, indices
+
+
+class StringTable(Sequence):
+    """
+    Read-only sequence of strings packed into one UTF-8 blob, where
+    string `i` is `blob[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        offsets = array("q", [0])
+        chunks = []
+        end = 0
+        for string in strings:
+            chunk = string.encode("utf-8")
+            chunks.append(chunk)
+            end += len(chunk)
+            offsets.append(end)
+        return cls(b"".join(chunks), offsets)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        offsets = self.offsets
+        return str(self.blob[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class SortedIndex():
+    """
+    Read-only mapping from a string to its position in `table`,
+    answered by binary search over `order`, a permutation of the
+    table's positions sorted by `key(table[i])`.
+    """
+
+    def __init__(self, table, order, key=None):
+        self.table = table
+        self.order = order
+        if key is None:
+            self.key = table.__getitem__
+        else:
+            self.key = lambda i: key(table[i])
+
+    def span(self, value):
+        """
+        Return the [lo, hi) range of `order` whose keys equal `value`.
+        """
+        order = self.order
+        lo = bisect_left(order, value, key=self.key)
+        hi = lo
+        while hi < len(order) and self.key(order[hi]) == value:
+            hi += 1
+        return lo, hi
+
+    def get(self, value, default=None):
+        lo, hi = self.span(value)
+        if lo == hi:
+            return default
+        return self.order[lo]
+
+    def __getitem__(self, value):
+        i = self.get(value)
+        if i is None:
+            raise KeyError(value)
+        return i
+
+    def __contains__(self, value):
+        return self.get(value) is not None
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a Graph shaped like the original `names` dict:
+    normalized name -> set of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.index = SortedIndex(
+            graph.person_names, graph.name_order, key=normalize
+        )
+
+    def __getitem__(self, name):
+        lo, hi = self.index.span(name)
+        if lo == hi:
+            raise KeyError(name)
+        order = self.graph.name_order
+        return {self.graph.person_ids[order[i]] for i in range(lo, hi)}
+
+    def __iter__(self):
+        names = self.graph.person_names
+        previous = None
+        for person in self.graph.name_order:
+            name = normalize(names[person])
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a Graph shaped like the original `people` dict:
+    person_id -> {"name", "birth", "movies" (a set of movie_ids)}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(person)}
+        }
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.num_people
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a Graph shaped like the original `movies` dict:
+    movie_id -> {"title", "year", "stars" (a set of person_ids)}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[p] for p in graph.stars_of(movie)}
+        }
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.num_movies
@@ -0,0 +1,312 @@
+"""
+Streaming, parallel ingestion of the degrees CSV files.
+
+people.csv and movies.csv are interned in the main process. stars.csv
+is read in line-aligned byte chunks that a process pool parses into
+arrays of (person, movie) indexes. The edges are then either gathered
+in memory or, given a spill directory, sorted into runs on disk and
+merged straight into CSR index arrays in memory-mapped files, so the
+star file never has to fit in memory at once.
+"""
+
+import csv
+import heapq
+import io
+import mmap
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+
+from graph import Graph, graph_from_edges
+
+# Bytes of stars.csv parsed per task
+CHUNK_SIZE = 1 << 22
+
+# Edges sorted in memory before being spilled to disk as one run
+RUN_SIZE = 1 << 22
+
+# Integers read from a run file at a time while merging
+BLOCK_SIZE = 1 << 16
+
+# Lookup tables installed in each parser process by init_parser
+person_index = None
+movie_index = None
+star_columns = None
+
+
+def ingest(directory, workers=1, spill_dir=None, progress=False):
+    """
+    Parse the CSV files in `directory` into a Graph.
+
+    Star chunks are parsed by `workers` processes. With `spill_dir`,
+    edges are sorted externally in that directory instead of held in
+    memory. With `progress`, rows per second are reported on stderr.
+    """
+    person_ids, person_names, person_births, people = read_nodes(
+        os.path.join(directory, "people.csv"), ("id", "name", "birth")
+    )
+    movie_ids, movie_titles, movie_years, movies = read_nodes(
+        os.path.join(directory, "movies.csv"), ("id", "title", "year")
+    )
+
+    path = os.path.join(directory, "stars.csv")
+    with open(path, encoding="utf-8", newline="") as f:
+        header = next(csv.reader(f))
+    columns = (header.index("person_id"), header.index("movie_id"))
+
+    reporter = Reporter(os.path.getsize(path)) if progress else None
+    chunks = read_chunks(path, CHUNK_SIZE)
+    initargs = (people, movies, columns)
+    if workers > 1:
+        pool = multiprocessing.Pool(
+            workers, initializer=init_parser, initargs=initargs
+        )
+        parsed = pool.imap(parse_chunk, chunks)
+    else:
+        pool = None
+        init_parser(*initargs)
+        parsed = map(parse_chunk, chunks)
+
+    try:
+        if spill_dir is None:
+            edge_people = array("i")
+            edge_movies = array("i")
+            for chunk_people, chunk_movies, rows, size in parsed:
+                edge_people.extend(chunk_people)
+                edge_movies.extend(chunk_movies)
+                if reporter:
+                    reporter.update(rows, size)
+        else:
+            adjacency = external_csr(
+                parsed, len(person_ids), len(movie_ids), spill_dir, reporter
+            )
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if reporter:
+        reporter.finish()
+
+    if spill_dir is None:
+        return graph_from_edges(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            edge_people, edge_movies
+        )
+    return Graph(
+        person_ids, person_names, person_births,
+        movie_ids, movie_titles, movie_years,
+        *adjacency
+    )
+
+
+def read_nodes(path, fields):
+    """
+    Read a people or movies CSV file. Returns lists of the values of
+    the three `fields` (id first), skipping repeated ids, and a dict
+    interning each id to its position.
+    """
+    ids, first, second = [], [], []
+    index = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        id_column, first_column, second_column = (
+            header.index(field) for field in fields
+        )
+        for row in reader:
+            if not row:
+                continue
+            node_id = row[id_column]
+            if node_id in index:
+                continue
+            index[node_id] = len(ids)
+            ids.append(node_id)
+            first.append(row[first_column])
+            second.append(row[second_column])
+    return ids, first, second, index
+
+
+def read_chunks(path, chunk_size):
+    """
+    Yield the data rows of a CSV file in chunks of about `chunk_size`
+    bytes that end on a line boundary. Star rows hold only ids, so no
+    quoted field spans a line break.
+    """
+    with open(path, "rb") as f:
+        f.readline()
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            if not chunk.endswith(b"\n"):
+                chunk += f.readline()
+            yield chunk
+
+
+def init_parser(people, movies, columns):
+    global person_index, movie_index, star_columns
+    person_index = people
+    movie_index = movies
+    star_columns = columns
+
+
+def parse_chunk(chunk):
+    """
+    Return (people, movies, rows, size) for a chunk of star rows:
+    parallel index arrays of its edges, skipping rows naming unknown
+    people or movies, the number of rows and the chunk's byte size.
+    """
+    person_column, movie_column = star_columns
+    people = array("i")
+    movies = array("i")
+    rows = 0
+    for row in csv.reader(io.StringIO(chunk.decode("utf-8"))):
+        if not row:
+            continue
+        rows += 1
+        person = person_index.get(row[person_column])
+        movie = movie_index.get(row[movie_column])
+        if person is None or movie is None:
+            continue
+        people.append(person)
+        movies.append(movie)
+    return people, movies, rows, len(chunk)
+
+
+def external_csr(parsed, num_people, num_movies, spill_dir, reporter=None):
+    """
+    Sort parsed edge chunks into runs under `spill_dir` and merge them
+    into (person_offsets, person_movies, movie_offsets, movie_people),
+    with the index arrays memory-mapped from disk.
+
+    Each edge is encoded as one integer per direction, row-major, so
+    sorting the integers sorts the edges by row and then by column.
+    """
+    directory = tempfile.mkdtemp(prefix="degrees-", dir=spill_dir)
+    try:
+        person_runs, movie_runs = [], []
+        person_keys = array("q")
+        movie_keys = array("q")
+        for chunk_people, chunk_movies, rows, size in parsed:
+            for person, movie in zip(chunk_people, chunk_movies):
+                person_keys.append(person * num_movies + movie)
+                movie_keys.append(movie * num_people + person)
+            if len(person_keys) >= RUN_SIZE:
+                person_runs.append(write_run(person_keys, directory))
+                movie_runs.append(write_run(movie_keys, directory))
+                person_keys = array("q")
+                movie_keys = array("q")
+            if reporter:
+                reporter.update(rows, size)
+        if person_keys:
+            person_runs.append(write_run(person_keys, directory))
+            movie_runs.append(write_run(movie_keys, directory))
+        del person_keys, movie_keys
+
+        person_offsets, person_movies = merge_runs(
+            person_runs, num_people, num_movies, directory
+        )
+        movie_offsets, movie_people = merge_runs(
+            movie_runs, num_movies, num_people, directory
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return person_offsets, person_movies, movie_offsets, movie_people
+
+
+def write_run(keys, directory):
+    """
+    Write `keys` sorted to a new run file in `directory`; return its path.
+    """
+    descriptor, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(descriptor, "wb") as f:
+        array("q", sorted(keys)).tofile(f)
+    return path
+
+
+def read_run(path):
+    """
+    Yield the keys of a run file, reading it a block at a time.
+    """
+    with open(path, "rb") as f:
+        while True:
+            block = array("q", f.read(BLOCK_SIZE * 8))
+            if not block:
+                return
+            yield from block
+
+
+def merge_runs(runs, count, width, directory):
+    """
+    Merge sorted run files of `row * width + column` keys over `count`
+    rows into CSR (offsets, indices), dropping duplicate keys. The
+    indices are written to a file and returned memory-mapped.
+    """
+    offsets = array("i", bytes(4 * (count + 1)))
+    descriptor, path = tempfile.mkstemp(suffix=".csr", dir=directory)
+    with os.fdopen(descriptor, "w+b") as f:
+        block = array("i")
+        previous = None
+        for key in heapq.merge(*(read_run(run) for run in runs)):
+            if key == previous:
+                continue
+            previous = key
+            row, column = divmod(key, width)
+            offsets[row + 1] += 1
+            block.append(column)
+            if len(block) >= BLOCK_SIZE:
+                block.tofile(f)
+                block = array("i")
+        block.tofile(f)
+        f.flush()
+        for run in runs:
+            os.remove(run)
+        if f.tell() == 0:
+            indices = array("i")
+        else:
+            indices = memoryview(
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            ).cast("i")
+    os.remove(path)
+
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    return offsets, indices
+
+
+class Reporter():
+    """
+    Reports star rows parsed per second on stderr, at most once a second.
+    """
+
+    def __init__(self, total_bytes):
+        self.total_bytes = total_bytes
+        self.rows = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def update(self, rows, size):
+        self.rows += rows
+        self.bytes += size
+        now = time.perf_counter()
+        if now - self.last >= 1:
+            self.last = now
+            self.report(now)
+
+    def report(self, now):
+        elapsed = max(now - self.start, 1e-9)
+        percent = 100 * self.bytes / max(self.total_bytes, 1)
+        print(
+            f"{self.rows} rows ({percent:.0f}%), "
+            f"{self.rows / elapsed:.0f} rows/s",
+            file=sys.stderr
+        )
+
+    def finish(self):
+        self.report(time.perf_counter())
@@ -0,0 +1,220 @@
+"""
+Landmark distance oracle for the degrees graph.
+
+A handful of high-degree "landmark" people are chosen and a breadth-first
+search from each records its distance to every person. By the triangle
+inequality, for any landmark L
+
+    |d(L, a) - d(L, b)| <= d(a, b) <= d(L, a) + d(L, b)
+
+so K distance tables bound the separation of any pair in O(K), and the
+lower bound doubles as an admissible A* heuristic (the ALT algorithm)
+that prunes the exact search.
+"""
+
+import heapq
+import math
+import os
+from array import array
+
+from snapshot import read_sections, write_sections
+
+LANDMARKS_NAME = "degrees.landmarks"
+
+# Default number of landmarks
+K = 8
+
+# Distance recorded for people a landmark cannot reach
+UNREACHABLE = -1
+
+
+class Landmarks():
+    """
+    Breadth-first distance tables from K landmark person indexes.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+        # No two people differ by more than this from any landmark
+        self.radius = max((max(table) for table in distances), default=0)
+
+    def bounds(self, a, b):
+        """
+        Return (lower, upper) bounds on the separation of person
+        indexes `a` and `b`. Both are math.inf if some landmark
+        reaches exactly one of them; `upper` is math.inf if no
+        landmark reaches both.
+        """
+        lower = 0
+        upper = math.inf
+        for table in self.distances:
+            da = table[a]
+            db = table[b]
+            if da == UNREACHABLE and db == UNREACHABLE:
+                continue
+            if da == UNREACHABLE or db == UNREACHABLE:
+                return math.inf, math.inf
+            lower = max(lower, abs(da - db))
+            upper = min(upper, da + db)
+        return lower, upper
+
+    def lower_bound(self, a, b):
+        """
+        Return a lower bound on the separation of `a` and `b`.
+        """
+        return self.bounds(a, b)[0]
+
+    def within(self, a, b, limit):
+        """
+        Return False if the landmarks prove `a` and `b` more than
+        `limit` apart, stopping at the first landmark that does.
+        """
+        for table in self.distances:
+            da = table[a]
+            db = table[b]
+            if da == UNREACHABLE or db == UNREACHABLE:
+                if da != db:
+                    return False
+            elif abs(da - db) > limit:
+                return False
+        return True
+
+
+def choose_landmarks(graph, k=K):
+    """
+    Return the indexes of the `k` people who starred in the most movies.
+    """
+    people = sorted(
+        range(graph.num_people), key=lambda p: (-graph.degree(p), p)
+    )
+    return array("i", people[:k])
+
+
+def bfs_distances(graph, source, limit=None):
+    """
+    Return an array of the separation of every person index from
+    `source`, with UNREACHABLE for people in other components or,
+    given `limit`, more than `limit` degrees away.
+    """
+    distances = array("h", [UNREACHABLE]) * graph.num_people
+    seen_movies = bytearray(graph.num_movies)
+    distances[source] = 0
+    layer = [source]
+    depth = 0
+    while layer and (limit is None or depth < limit):
+        depth += 1
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for neighbor in graph.stars_of(movie):
+                    if distances[neighbor] == UNREACHABLE:
+                        distances[neighbor] = depth
+                        next_layer.append(neighbor)
+        layer = next_layer
+    return distances
+
+
+def build_landmarks(graph, k=K):
+    """
+    Choose `k` landmarks and compute their distance tables.
+    """
+    landmarks = choose_landmarks(graph, k)
+    return Landmarks(
+        landmarks, [bfs_distances(graph, person) for person in landmarks]
+    )
+
+
+def write_landmarks(path, landmarks, signature):
+    """
+    Persist landmark tables to `path`, tagged with the dataset signature.
+    """
+    sections = {"landmarks": landmarks.landmarks}
+    for i, table in enumerate(landmarks.distances):
+        sections[f"distances.{i}"] = table
+    write_sections(path, sections, signature, kind="landmarks")
+
+
+def read_landmarks(path, signature=None, k=None):
+    """
+    Return the memory-mapped landmark tables at `path`, or None if they
+    are missing, stale against `signature` or not for `k` landmarks.
+    """
+    header, sections = read_sections(path)
+    if header is None or header.get("kind") != "landmarks":
+        return None
+    if signature is not None and header["signature"] != signature:
+        return None
+    landmarks = sections["landmarks"]
+    if k is not None and len(landmarks) != k:
+        return None
+    return Landmarks(
+        landmarks,
+        [sections[f"distances.{i}"] for i in range(len(landmarks))]
+    )
+
+
+def load_landmarks(directory, graph, signature, k=K, rebuild=False):
+    """
+    Return landmark tables for the dataset in `directory`, reading
+    them from disk when fresh and computing and saving them otherwise.
+    """
+    path = os.path.join(directory, LANDMARKS_NAME)
+    landmarks = None
+    if not rebuild:
+        landmarks = read_landmarks(path, signature, k)
+    if landmarks is None:
+        landmarks = build_landmarks(graph, k)
+        try:
+            write_landmarks(path, landmarks, signature)
+        except OSError:
+            pass
+    return landmarks
+
+
+def alt_search(graph, landmarks, source, target):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source index to the target index, or None.
+
+    A* search guided by the landmark lower bound to the target; people
+    whose bound shows they cannot lie on a path within the landmark
+    upper bound are never expanded.
+    """
+    if source == target:
+        return []
+    lower, upper = landmarks.bounds(source, target)
+    if lower == math.inf:
+        return None
+
+    # Each reached person maps to its depth and (movie, person) parent
+    depth = {source: 0}
+    parent = {source: None}
+    frontier = [(lower, 0, source)]
+    while frontier:
+        _, negative_depth, person = heapq.heappop(frontier)
+        g = -negative_depth
+        if g > depth[person]:
+            continue
+        if person == target:
+            path = []
+            while parent[person] is not None:
+                movie, previous = parent[person]
+                path.append((movie, person))
+                person = previous
+            path.reverse()
+            return path
+        for movie, neighbor in graph.neighbors(person):
+            if neighbor in depth and depth[neighbor] <= g + 1:
+                continue
+            estimate = g + 1 + landmarks.lower_bound(neighbor, target)
+            if estimate > upper:
+                continue
+            depth[neighbor] = g + 1
+            parent[neighbor] = (movie, person)
+            heapq.heappush(frontier, (estimate, -(g + 1), neighbor))
+    return None
@@ -0,0 +1,194 @@
+"""
+Name resolution index for the degrees graph.
+
+Exact and prefix lookups binary-search the graph's people sorted by
+normalized name. Fuzzy lookups use an inverted index from character
+trigrams to the people whose name contains them, stored in CSR form
+(a sorted trigram table, offsets and postings) so it can be saved in
+and memory-mapped from the snapshot.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+from graph import SortedIndex, StringTable, normalize
+
+# A ranked match for a looked-up name
+Candidate = namedtuple(
+    "Candidate", ["person_id", "name", "birth", "movies", "score"]
+)
+
+# How to pick one of several people sharing a name without asking
+POLICIES = ("ask", "error", "most-movies", "oldest", "youngest")
+
+# Fraction of a query's trigrams a fuzzy match must share
+MIN_OVERLAP = 0.3
+
+
+def trigrams(name):
+    """
+    Return the set of character trigrams of a normalized, padded name.
+    """
+    padded = f"  {normalize(name)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex():
+    """
+    Exact, prefix and trigram lookups of people by name.
+    """
+
+    def __init__(self, graph, grams, offsets, postings):
+        self.graph = graph
+        self.grams = grams
+        self.offsets = offsets
+        self.postings = postings
+        self.names = SortedIndex(
+            graph.person_names, graph.name_order, key=normalize
+        )
+
+    def candidate(self, person, score):
+        graph = self.graph
+        return Candidate(
+            graph.person_ids[person], graph.person_names[person],
+            graph.person_births[person], graph.degree(person), score
+        )
+
+    def exact(self, name):
+        """
+        Return candidates whose name equals `name`, ignoring case and
+        differences in whitespace.
+        """
+        lo, hi = self.names.span(normalize(name))
+        order = self.graph.name_order
+        return [self.candidate(order[i], 1.0) for i in range(lo, hi)]
+
+    def prefix(self, prefix, limit=10):
+        """
+        Return up to `limit` candidates whose name starts with `prefix`,
+        ignoring case and differences in whitespace, in name order.
+        """
+        prefix = normalize(prefix)
+        order = self.graph.name_order
+        names = self.graph.person_names
+        i = bisect_left(order, prefix, key=self.names.key)
+        matches = []
+        while i < len(order) and len(matches) < limit:
+            person = order[i]
+            if not normalize(names[person]).startswith(prefix):
+                break
+            matches.append(self.candidate(person, 1.0))
+            i += 1
+        return matches
+
+    def postings_for(self, gram):
+        i = bisect_left(self.grams, gram)
+        if i == len(self.grams) or self.grams[i] != gram:
+            return ()
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def fuzzy(self, name, limit=10):
+        """
+        Return up to `limit` candidates ranked by the trigram similarity
+        (Jaccard index) of their name to `name`.
+        """
+        query = trigrams(name)
+        if not query:
+            return []
+        hits = Counter()
+        for gram in query:
+            hits.update(self.postings_for(gram))
+        threshold = MIN_OVERLAP * len(query)
+        names = self.graph.person_names
+        scored = []
+        for person, shared in hits.items():
+            if shared < threshold:
+                continue
+            union = len(query) + len(trigrams(names[person])) - shared
+            scored.append((shared / union, self.graph.degree(person), person))
+        return [
+            self.candidate(person, score)
+            for score, _, person in heapq.nlargest(limit, scored)
+        ]
+
+    def search(self, name, limit=10):
+        """
+        Return up to `limit` candidates for `name`: exact matches, then
+        prefix matches, then fuzzy matches, each group ranked.
+        """
+        results = sorted(self.exact(name), key=lambda c: -c.movies)
+        seen = {c.person_id for c in results}
+        for candidate in self.prefix(name, limit) + self.fuzzy(name, limit):
+            if len(results) >= limit:
+                break
+            if candidate.person_id not in seen:
+                seen.add(candidate.person_id)
+                results.append(candidate)
+        return results[:limit]
+
+
+def choose(candidates, policy):
+    """
+    Return the candidate `policy` picks among people sharing a name,
+    or None if it declines to pick ("error") or there are none.
+    """
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0]
+    if policy == "most-movies":
+        return max(candidates, key=lambda c: c.movies)
+    if policy in ("oldest", "youngest"):
+        born = [c for c in candidates if c.birth.isdigit()]
+        if not born:
+            return None
+        if policy == "oldest":
+            return min(born, key=lambda c: int(c.birth))
+        return max(born, key=lambda c: int(c.birth))
+    return None
+
+
+def build_name_index(graph):
+    """
+    Build the trigram index of every person's name in `graph`.
+    """
+    postings = {}
+    for person, name in enumerate(graph.person_names):
+        for gram in trigrams(name):
+            if gram not in postings:
+                postings[gram] = array("i")
+            postings[gram].append(person)
+
+    grams = sorted(postings)
+    offsets = array("q", [0])
+    flat = array("i")
+    for gram in grams:
+        flat.extend(postings[gram])
+        offsets.append(len(flat))
+    return NameIndex(graph, StringTable.from_strings(grams), offsets, flat)
+
+
+def name_index_sections(index):
+    """
+    Return the snapshot sections storing `index`.
+    """
+    return {
+        "name_grams.blob": index.grams.blob,
+        "name_grams.offsets": index.grams.offsets,
+        "name_gram_offsets": index.offsets,
+        "name_gram_postings": index.postings
+    }
+
+
+def name_index_from_sections(graph, sections):
+    """
+    Return the NameIndex stored in snapshot `sections` for `graph`.
+    """
+    return NameIndex(
+        graph,
+        StringTable(sections["name_grams.blob"], sections["name_grams.offsets"]),
+        sections["name_gram_offsets"],
+        sections["name_gram_postings"]
+    )
@@ -0,0 +1,220 @@
+"""
+Enumeration of many paths between two people in the degrees graph.
+
+ShortestPathDAG holds the subgraph of every shortest path: the people
+whose distances from the source and to the target add up to the
+separation, layered by distance from the source. Shortest paths are
+counted and yielded from it one at a time, so memory stays linear in
+the graph however many paths there are. k_shortest_paths runs Yen's
+algorithm for the k shortest simple paths of any length.
+
+Paths are lists of (movie, person) index pairs, as in shortest_path.
+"""
+
+import heapq
+import itertools
+from collections import deque
+
+from landmarks import UNREACHABLE, bfs_distances
+from util import UNSEEN, ParentPointers
+
+
+def separation(graph, source, target):
+    """
+    Return the degrees of separation between two person indexes,
+    or None if they are not connected.
+    """
+    path = spur_search(graph, source, target, set(), set())
+    return None if path is None else len(path)
+
+
+class ShortestPathDAG():
+    """
+    Every shortest path between two person indexes, as a DAG layered
+    by distance from the source.
+    """
+
+    def __init__(self, graph, source, target):
+        self.graph = graph
+        self.source = source
+        self.target = target
+        self.length = separation(graph, source, target)
+        self.layers = []
+        if self.length is None:
+            return
+        self.from_source = bfs_distances(graph, source, self.length)
+        self.to_target = bfs_distances(graph, target, self.length)
+        self.layers = [[] for _ in range(self.length + 1)]
+        for person in range(graph.num_people):
+            if self.on_path(person):
+                self.layers[self.from_source[person]].append(person)
+
+    def on_path(self, person):
+        """
+        Return True if `person` lies on some shortest path.
+        """
+        from_source = self.from_source[person]
+        to_target = self.to_target[person]
+        return (from_source != UNREACHABLE and to_target != UNREACHABLE
+                and from_source + to_target == self.length)
+
+    def successors(self, person):
+        """
+        Yield the (movie, person) steps that continue a shortest path
+        from `person`.
+        """
+        depth = self.from_source[person] + 1
+        remaining = self.to_target[person] - 1
+        for movie in self.graph.movies_of(person):
+            for neighbor in self.graph.stars_of(movie):
+                if (self.from_source[neighbor] == depth
+                        and self.to_target[neighbor] == remaining):
+                    yield movie, neighbor
+
+    def count(self):
+        """
+        Return the number of distinct shortest paths, counting paths
+        through the same people via different movies separately.
+        """
+        if self.length is None:
+            return 0
+        counts = {self.source: 1}
+        for layer in self.layers[:-1]:
+            for person in layer:
+                for _, neighbor in self.successors(person):
+                    counts[neighbor] = counts.get(neighbor, 0) + counts[person]
+        return counts.get(self.target, 0)
+
+    def paths(self):
+        """
+        Yield every shortest path lazily, in depth-first order.
+        """
+        if self.length is None:
+            return
+        if self.length == 0:
+            yield []
+            return
+        path = []
+        stack = [self.successors(self.source)]
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                stack.pop()
+                if path:
+                    path.pop()
+                continue
+            path.append(step)
+            if step[1] == self.target:
+                yield list(path)
+                path.pop()
+            else:
+                stack.append(self.successors(step[1]))
+
+    def best(self, k, weight):
+        """
+        Return the `k` shortest paths with the lowest total
+        `weight(movie)` over their movies, cheapest first.
+
+        Each person keeps back pointers to its k cheapest partial
+        paths only, so memory is bounded by k times the DAG size.
+        """
+        if self.length is None:
+            return []
+        # Maps a person to sorted (cost, previous person, movie, rank)
+        best = {self.source: [(0, None, None, 0)]}
+        for layer in self.layers[:-1]:
+            candidates = {}
+            for person in layer:
+                for movie, neighbor in self.successors(person):
+                    cost = weight(movie)
+                    for rank, entry in enumerate(best[person]):
+                        candidates.setdefault(neighbor, []).append(
+                            (entry[0] + cost, person, movie, rank)
+                        )
+            for neighbor, entries in candidates.items():
+                best[neighbor] = heapq.nsmallest(k, entries)
+
+        paths = []
+        for rank in range(len(best.get(self.target, []))):
+            path = []
+            person = self.target
+            while person != self.source:
+                _, previous, movie, previous_rank = best[person][rank]
+                path.append((movie, person))
+                person, rank = previous, previous_rank
+            path.reverse()
+            paths.append(path)
+        return paths
+
+
+def spur_search(graph, source, target, banned_people, banned_steps):
+    """
+    Return a shortest path from `source` to `target` avoiding
+    `banned_people` and not starting with any of `banned_steps`,
+    or None.
+    """
+    if source == target:
+        return []
+    parents = ParentPointers(graph.num_people)
+    parents.add_root(source)
+
+    # Banned people count as reached already, so one test skips both
+    for person in banned_people:
+        parents.add_root(person)
+    reached = parents.parents
+    frontier = deque([source])
+    while frontier:
+        person = frontier.popleft()
+        for movie, neighbor in graph.neighbors(person):
+            if reached[neighbor] != UNSEEN:
+                continue
+            if person == source and (movie, neighbor) in banned_steps:
+                continue
+            parents.add(neighbor, person, movie)
+            if neighbor == target:
+                return parents.path(target)
+            frontier.append(neighbor)
+    return None
+
+
+def k_shortest_paths(graph, source, target, k):
+    """
+    Yield up to `k` simple paths from `source` to `target` in order
+    of length, by Yen's algorithm. At most k candidates are kept
+    between rounds.
+    """
+    first = spur_search(graph, source, target, set(), set())
+    if first is None:
+        return
+    found = [first]
+    yield first
+    candidates = []
+    seen = {tuple(first)}
+    counter = itertools.count()
+
+    while len(found) < k:
+        previous = found[-1]
+        for j in range(len(previous)):
+            root = previous[:j]
+            spur = source if j == 0 else root[-1][1]
+            banned_steps = {
+                path[j] for path in found
+                if len(path) > j and path[:j] == root
+            }
+            banned_people = {source} | {person for _, person in root}
+            banned_people.discard(spur)
+            tail = spur_search(graph, spur, target, banned_people, banned_steps)
+            if tail is None:
+                continue
+            path = root + tail
+            if tuple(path) in seen:
+                continue
+            seen.add(tuple(path))
+            heapq.heappush(candidates, (len(path), next(counter), path))
+        if not candidates:
+            return
+        candidates = heapq.nsmallest(k - len(found), candidates)
+        heapq.heapify(candidates)
+        path = heapq.heappop(candidates)[2]
+        found.append(path)
+        yield path
@@ -0,0 +1,224 @@
+"""
+Batch query mode for degrees.
+
+Loads the graph once and answers many source/target queries, read one
+per line from stdin, a file of pairs or a local (Unix domain) socket,
+writing one JSON object per line. A query line is either a JSON object
+with "source" and "target" (and an optional "id" echoed back) or two
+names or person ids separated by a tab.
+
+Queries run in parallel across worker processes. Forked workers share
+the parent's graph; otherwise each worker memory-maps the same snapshot,
+so the graph is only ever held once in memory.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socketserver
+import sys
+
+import degrees
+from nameindex import POLICIES, choose
+
+# Query lines handed to a worker at a time when reading a pairs file;
+# streams hand over each line as it arrives
+CHUNKSIZE = 16
+
+# Policy for names shared by several people, set by init_worker
+policy = "error"
+
+
+def parse_query(line):
+    """
+    Return the query dictionary encoded by an input line.
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        query = json.loads(line)
+        if not isinstance(query, dict):
+            raise ValueError("Query must be a JSON object")
+        return query
+    fields = line.split("\t")
+    if len(fields) != 2:
+        raise ValueError("Expected two tab-separated names")
+    return {"source": fields[0], "target": fields[1]}
+
+
+def resolve(person):
+    """
+    Returns the person_id for a person_id or a name, picking among
+    people sharing the name by the ambiguity `policy`.
+    """
+    if person in degrees.people:
+        return person
+    candidates = degrees.name_index.exact(person)
+    if len(candidates) == 0:
+        suggestions = "; ".join(
+            describe(candidate)
+            for candidate in degrees.name_index.fuzzy(person, limit=3)
+        )
+        raise LookupError(
+            f"Person not found: {person}"
+            + (f" (did you mean: {suggestions})" if suggestions else "")
+        )
+    candidate = choose(candidates, policy)
+    if candidate is None:
+        raise LookupError(
+            f"Ambiguous name: {person} "
+            f"({'; '.join(describe(c) for c in candidates)})"
+        )
+    return candidate.person_id
+
+
+def describe(candidate):
+    """
+    Return a short "name, born year, id" description of a Candidate.
+    """
+    birth = candidate.birth or "unknown"
+    return f"{candidate.name}, born {birth}, ID {candidate.person_id}"
+
+
+def answer(line):
+    """
+    Return the JSON line answering one query line.
+    """
+    result = {}
+    try:
+        query = parse_query(line)
+        if "id" in query:
+            result["id"] = query["id"]
+        source = resolve(str(query["source"]))
+        target = resolve(str(query["target"]))
+        result["source"] = source
+        result["target"] = target
+        path = degrees.shortest_path(source, target, bidirectional=True)
+        if path is None:
+            result["degrees"] = None
+            result["path"] = None
+        else:
+            result["degrees"] = len(path)
+            result["path"] = [
+                {"movie": movie_id, "person": person_id}
+                for movie_id, person_id in path
+            ]
+    except KeyError as e:
+        result["error"] = f"Missing field: {e}"
+    except (ValueError, LookupError) as e:
+        result["error"] = str(e)
+    return json.dumps(result)
+
+
+def answers(lines, pool=None, chunksize=1):
+    """
+    Yield the JSON answer to each non-blank line, in input order.
+
+    The pool waits for `chunksize` lines before handing them to a
+    worker, so interactive streams must keep the default of 1. The
+    pool's single task thread reads `lines` itself, so a pool shared
+    between clients must never be given one of theirs; see
+    QueryHandler.
+    """
+    queries = (line for line in lines if line.strip())
+    if pool is None:
+        return map(answer, queries)
+    return pool.imap(answer, queries, chunksize=chunksize)
+
+
+def init_worker(directory, ambiguous):
+    """
+    Make the graph and ambiguity policy available in a worker process.
+    """
+    global policy
+    policy = ambiguous
+    if degrees.graph is None:
+        degrees.load_data(directory)
+
+
+class QueryHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the query lines sent over one socket connection.
+
+    Lines are read in the connection's own thread and submitted one at
+    a time, so an idle client only ever blocks its own thread.
+    """
+
+    def handle(self):
+        pool = self.server.pool
+        for line in self.rfile:
+            line = line.decode("utf-8")
+            if not line.strip():
+                continue
+            if pool is None:
+                result = answer(line)
+            else:
+                result = pool.apply(answer, (line,))
+            self.wfile.write(f"{result}\n".encode("utf-8"))
+
+
+class QueryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, pool):
+        self.pool = pool
+        super().__init__(path, QueryHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python server.py [directory] [--pairs FILE | --socket PATH] "
+              "[--workers N] [--ambiguous POLICY]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--pairs", help="read query lines from this file")
+    source.add_argument("--socket", help="serve queries on this socket path")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of worker processes (default: one per core)"
+    )
+    parser.add_argument(
+        "--ambiguous", choices=[p for p in POLICIES if p != "ask"],
+        default="error",
+        help="how to pick among people sharing a name (default: error)"
+    )
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    init_worker(args.directory, args.ambiguous)
+    print("Data loaded.", file=sys.stderr)
+
+    pool = None
+    if args.workers > 1:
+        pool = multiprocessing.Pool(
+            args.workers, initializer=init_worker,
+            initargs=(args.directory, args.ambiguous)
+        )
+
+    try:
+        if args.socket:
+            with QueryServer(args.socket, pool) as server:
+                print(f"Listening on {args.socket}", file=sys.stderr)
+                try:
+                    server.serve_forever()
+                finally:
+                    os.unlink(args.socket)
+        elif args.pairs:
+            with open(args.pairs, encoding="utf-8") as f:
+                for result in answers(f, pool, CHUNKSIZE):
+                    print(result, flush=True)
+        else:
+            for result in answers(sys.stdin, pool):
+                print(result, flush=True)
+    except KeyboardInterrupt:
+        if pool is not None:
+            pool.terminate()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Binary snapshots of a loaded degrees Graph.
+
+After the CSV files are parsed once, the interned ids and adjacency
+arrays are written to a snapshot next to them. Later starts memory-map
+the snapshot instead of parsing, as long as the size and modification
+time of every CSV file still match the ones recorded in it.
+
+Layout: MAGIC, an 8-byte little-endian header length, a JSON header,
+then each section at an 8-byte aligned offset given by the header.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from graph import Graph, SortedIndex, StringTable
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 3
+SNAPSHOT_NAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_people")
+TABLES = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+)
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def signature(directory):
+    """
+    Return the (size, mtime) of each source CSV file in `directory`.
+    """
+    result = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        result[name] = [stat.st_size, stat.st_mtime_ns]
+    return result
+
+
+def graph_sections(graph):
+    """
+    Return the named buffers making up a snapshot of `graph`.
+    """
+    sections = {}
+    for name in ARRAYS:
+        sections[name] = getattr(graph, name)
+    for name in TABLES:
+        table = getattr(graph, name)
+        if not isinstance(table, StringTable):
+            table = StringTable.from_strings(table)
+        sections[f"{name}.blob"] = table.blob
+        sections[f"{name}.offsets"] = table.offsets
+    sections["person_order"] = array("i", sorted(
+        range(graph.num_people), key=graph.person_ids.__getitem__
+    ))
+    sections["movie_order"] = array("i", sorted(
+        range(graph.num_movies), key=graph.movie_ids.__getitem__
+    ))
+    sections["name_order"] = graph.name_order
+    return sections
+
+
+def write_snapshot(path, graph, signature, extra=None):
+    """
+    Write a snapshot of `graph` to `path`, tagged with the source
+    `signature`. `extra` maps additional section names to buffers.
+    """
+    sections = graph_sections(graph)
+    if extra:
+        sections.update(extra)
+    write_sections(path, sections, signature)
+
+
+def write_sections(path, sections, signature, **fields):
+    """
+    Write named buffers to a snapshot file at `path`, tagged with the
+    source `signature` and any extra JSON-serializable header `fields`.
+    """
+    # Section offsets are relative to the 8-byte aligned end of the header
+    entries = {}
+    offset = 0
+    for name, buffer in sections.items():
+        view = memoryview(buffer)
+        entries[name] = {
+            "type": view.format,
+            "offset": offset,
+            "size": view.nbytes
+        }
+        offset = align(offset + view.nbytes)
+    header = {
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "signature": signature,
+        "sections": entries,
+        **fields
+    }
+    encoded = json.dumps(header).encode("utf-8")
+    start = data_start(len(encoded))
+
+    temporary = f"{path}.tmp{os.getpid()}"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for name, buffer in sections.items():
+            f.seek(start + entries[name]["offset"])
+            f.write(memoryview(buffer).cast("B"))
+    os.replace(temporary, path)
+
+
+def align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def data_start(header_length):
+    """
+    Return the file offset of the first section after a header.
+    """
+    return align(len(MAGIC) + 8 + header_length)
+
+
+def read_header(path):
+    """
+    Return the JSON header of the snapshot at `path`, with the offset of
+    its first section as "start", or None if it is missing, unreadable
+    or written by an incompatible version.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length))
+            header["start"] = data_start(length)
+    except (OSError, ValueError, struct.error):
+        return None
+    if header.get("version") != VERSION:
+        return None
+    if header.get("byteorder") != sys.byteorder:
+        return None
+    return header
+
+
+def read_sections(path):
+    """
+    Memory-map the snapshot at `path` and return (header, sections),
+    with each section a zero-copy memoryview of its typed contents.
+    """
+    header = read_header(path)
+    if header is None:
+        return None, None
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    sections = {}
+    for name, entry in header["sections"].items():
+        offset = header["start"] + entry["offset"]
+        section = view[offset:offset + entry["size"]]
+        if entry["type"] != "B":
+            section = section.cast(entry["type"])
+        sections[name] = section
+    return header, sections
+
+
+def read_snapshot(path, signature=None):
+    """
+    Return (graph, sections) for the snapshot at `path`, where sections
+    include any extra ones written with it, or (None, None) if there is
+    no usable snapshot or, when `signature` is given, it is stale.
+    """
+    header, sections = read_sections(path)
+    if header is None:
+        return None, None
+    if signature is not None and header["signature"] != signature:
+        return None, None
+    return graph_from_sections(sections), sections
+
+
+def graph_from_sections(sections):
+    """
+    Return a Graph backed by memory-mapped snapshot sections.
+    """
+    tables = {
+        name: StringTable(sections[f"{name}.blob"], sections[f"{name}.offsets"])
+        for name in TABLES
+    }
+    arrays = {name: sections[name] for name in ARRAYS}
+    return Graph(
+        **tables, **arrays,
+        person_index=SortedIndex(tables["person_ids"], sections["person_order"]),
+        movie_index=SortedIndex(tables["movie_ids"], sections["movie_order"]),
+        name_order=sections["name_order"]
+    )
@@ -0,0 +1,273 @@
+"""
+Graph-wide statistics for the degrees dataset.
+
+Computes, in one batch over the loaded graph:
+    * the distribution of movies per person and stars per movie,
+    * connected components of people, by union-find over movies,
+    * "Bacon number" histograms: how many people are at each degree of
+      separation from each of a set of source people.
+
+Separation histograms use a bit-parallel multi-source BFS: every
+person carries an integer bitmask with one bit per source, so a single
+traversal of the graph advances the frontiers of a whole batch of
+sources at once. Source batches and slices of the union-find run
+across a process pool, and results are written as CSV files.
+
+Usage: python stats.py [directory] [--sources NAME ...] [--top K]
+                       [--output DIR] [--workers N]
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+from array import array
+from collections import Counter
+
+import degrees
+from landmarks import choose_landmarks
+
+# Sources advanced together by one multi-source BFS
+BATCH_SIZE = 64
+
+
+def init_worker(directory):
+    """
+    Make the graph available in a worker process.
+    """
+    if degrees.graph is None:
+        degrees.load_data(directory)
+
+
+def separation_histograms(sources):
+    """
+    Return, for each source person index, a list whose entry d is the
+    number of people at separation d from it.
+    """
+    graph = degrees.graph
+    seen = [0] * graph.num_people
+    frontier = {}
+    for bit, source in enumerate(sources):
+        seen[source] |= 1 << bit
+        frontier[source] = frontier.get(source, 0) | 1 << bit
+    histograms = [[1] for _ in sources]
+
+    while frontier:
+        # Gather each movie's incoming frontier bits, then push them
+        # to its stars that have not seen those sources yet
+        movie_masks = {}
+        for person, mask in frontier.items():
+            for movie in graph.movies_of(person):
+                movie_masks[movie] = movie_masks.get(movie, 0) | mask
+        next_frontier = {}
+        for movie, mask in movie_masks.items():
+            for person in graph.stars_of(movie):
+                new = mask & ~seen[person]
+                if new:
+                    seen[person] |= new
+                    next_frontier[person] = next_frontier.get(person, 0) | new
+
+        counts = [0] * len(sources)
+        for mask in next_frontier.values():
+            while mask:
+                low = mask & -mask
+                counts[low.bit_length() - 1] += 1
+                mask ^= low
+        for histogram, count in zip(histograms, counts):
+            if count:
+                histogram.append(count)
+        frontier = next_frontier
+    return histograms
+
+
+def find(parents, person):
+    """
+    Return the root of `person` in a union-find forest, halving paths.
+    """
+    while parents[person] != person:
+        parents[person] = parents[parents[person]]
+        person = parents[person]
+    return person
+
+
+def union(parents, sizes, a, b):
+    """
+    Join the sets of `a` and `b`; return False if already joined.
+    """
+    a = find(parents, a)
+    b = find(parents, b)
+    if a == b:
+        return False
+    if sizes[a] < sizes[b]:
+        a, b = b, a
+    parents[b] = a
+    sizes[a] += sizes[b]
+    return True
+
+
+def spanning_edges(movies):
+    """
+    Return parallel arrays of (person, person) pairs forming a spanning
+    forest of the people joined by the movie indexes in range `movies`.
+    """
+    graph = degrees.graph
+    parents = array("i", range(graph.num_people))
+    sizes = array("i", [1]) * graph.num_people
+    left = array("i")
+    right = array("i")
+    for movie in range(*movies):
+        stars = graph.stars_of(movie)
+        for person in stars[1:]:
+            if union(parents, sizes, stars[0], person):
+                left.append(stars[0])
+                right.append(person)
+    return left, right
+
+
+def component_sizes(pool, workers):
+    """
+    Return a Counter of connected component size -> number of components.
+    """
+    graph = degrees.graph
+    step = -(-graph.num_movies // max(workers, 1))
+    slices = [
+        (start, min(start + step, graph.num_movies))
+        for start in range(0, graph.num_movies, max(step, 1))
+    ]
+    parts = pool.map(spanning_edges, slices) if pool else map(
+        spanning_edges, slices
+    )
+
+    parents = array("i", range(graph.num_people))
+    sizes = array("i", [1]) * graph.num_people
+    for left, right in parts:
+        for a, b in zip(left, right):
+            union(parents, sizes, a, b)
+    return Counter(
+        sizes[person] for person in range(graph.num_people)
+        if parents[person] == person
+    )
+
+
+def degree_distribution(offsets):
+    """
+    Return a Counter of row length -> rows for CSR `offsets`.
+    """
+    return Counter(
+        offsets[i + 1] - offsets[i] for i in range(len(offsets) - 1)
+    )
+
+
+def write_counter(path, header, counter):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for key in sorted(counter):
+            writer.writerow([key, counter[key]])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python stats.py [directory] [--sources NAME ...] [--top K] "
+              "[--output DIR] [--workers N]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--sources", nargs="+", default=[], metavar="NAME",
+        help="names or person ids to compute separation histograms from"
+    )
+    parser.add_argument(
+        "--top", type=int, default=BATCH_SIZE, metavar="K",
+        help="without --sources, use the K people with the most movies"
+    )
+    parser.add_argument("--output", default="stats", metavar="DIR")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of worker processes (default: one per core)"
+    )
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory)
+    print("Data loaded.", file=sys.stderr)
+    graph = degrees.graph
+
+    if args.sources:
+        sources = []
+        for name in args.sources:
+            if name in degrees.people:
+                person_id = name
+            else:
+                person_id = degrees.person_id_for_name(name, policy="most-movies")
+            if person_id is None:
+                sys.exit(f"Person not found: {name}")
+            sources.append(graph.person_index[person_id])
+    else:
+        sources = list(choose_landmarks(graph, args.top))
+
+    pool = None
+    if args.workers > 1:
+        pool = multiprocessing.Pool(
+            args.workers, initializer=init_worker, initargs=(args.directory,)
+        )
+    try:
+        os.makedirs(args.output, exist_ok=True)
+        write_counter(
+            os.path.join(args.output, "movies_per_person.csv"),
+            ["movies", "people"], degree_distribution(graph.person_offsets)
+        )
+        write_counter(
+            os.path.join(args.output, "stars_per_movie.csv"),
+            ["stars", "movies"], degree_distribution(graph.movie_offsets)
+        )
+
+        print("Finding connected components...", file=sys.stderr)
+        components = component_sizes(pool, args.workers)
+        write_counter(
+            os.path.join(args.output, "components.csv"),
+            ["size", "components"], components
+        )
+
+        print(f"Measuring separation from {len(sources)} people...",
+              file=sys.stderr)
+        batches = [
+            sources[i:i + BATCH_SIZE]
+            for i in range(0, len(sources), BATCH_SIZE)
+        ]
+        results = pool.imap(separation_histograms, batches) if pool else map(
+            separation_histograms, batches
+        )
+        total = Counter()
+        with open(os.path.join(args.output, "separation.csv"), "w",
+                  newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["person_id", "name", "degrees", "people"])
+            for batch, histograms in zip(batches, results):
+                for source, histogram in zip(batch, histograms):
+                    person_id = graph.person_ids[source]
+                    name = graph.person_names[source]
+                    for distance, count in enumerate(histogram):
+                        writer.writerow([person_id, name, distance, count])
+                        total[distance] += count
+                    unreachable = graph.num_people - sum(histogram)
+                    writer.writerow([person_id, name, "", unreachable])
+                    total[""] += unreachable
+        with open(os.path.join(args.output, "separation_total.csv"), "w",
+                  newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["degrees", "pairs"])
+            for distance in sorted(total, key=lambda d: (d == "", d or 0)):
+                writer.writerow([distance, total[distance]])
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    largest = max(components) if components else 0
+    print(f"{sum(components.values())} components, largest {largest} people.")
+    print(f"Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from array import array
+from collections import deque
+
+
+class Node():
+    __slots__ = ("state", "parent", "action")
+
+    def __init__(self, state, parent, action):
+        self.state = state
+        self.parent = parent
+        self.action = action
+
+
+class StackFrontier():
+    """
+    Last-in first-out frontier of Nodes that also indexes their states,
+    so `contains_state` is a set lookup rather than a scan.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = set()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states.add(node.state)
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self.states.discard(node.state)
+            return node
+
+
+class QueueFrontier(StackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self.states.discard(node.state)
+            return node
+
+
+# Parent recorded for states not reached yet
+UNSEEN = -1
+
+
+class ParentPointers():
+    """
+    Search tree over dense integer states, kept as two flat arrays of
+    parent state and action instead of one Node object per state.
+    A state is in the tree once it has a parent; the root is its own.
+    """
+    __slots__ = ("parents", "actions")
+
+    def __init__(self, size):
+        self.parents = array("i", [UNSEEN]) * size
+        self.actions = array("i", [UNSEEN]) * size
+
+    def add_root(self, state):
+        self.parents[state] = state
+
+    def add(self, state, parent, action):
+        self.parents[state] = parent
+        self.actions[state] = action
+
+    def __contains__(self, state):
+        return self.parents[state] != UNSEEN
+
+    def path(self, state):
+        """
+        Return the (action, state) pairs leading from the root to `state`.
+        """
+        path = []
+        parent = self.parents[state]
+        while parent != state:
+            path.append((self.actions[state], state))
+            state = parent
+            parent = self.parents[state]
+        path.reverse()
+        return path
@@ -0,0 +1,187 @@
+"""
+Score many family files in one process pool.
+
+Usage: python batch.py (DIRECTORY | MANIFEST) [--format {jsonl,csv}]
+       [--output FILE] [--workers N] [--engine ENGINE] [--exact-max N]
+       [--samples N] [--seed S]
+
+Takes a directory of family CSV files, or a manifest listing one file
+per line (relative to the manifest, blank lines and # comments
+skipped). Families are scored by a pool of worker processes, each of
+which imports the engines once, and results are written as they
+finish, one JSON line per family or one CSV row per person, with the
+time each family took.
+
+The "auto" engine runs exact inference on families of up to
+`--exact-max` people and Gibbs sampling on larger ones, or on any
+family too interbred for exact inference.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from heredity import ENGINES, PROBS, load_data
+from sampling import SAMPLERS, SAMPLES, sample
+
+# Largest family the auto engine scores exactly
+EXACT_MAX = 100
+
+CSV_FIELDS = [
+    "file", "engine", "person", "gene_2", "gene_1", "gene_0", "trait",
+    "gene_2_error", "gene_1_error", "gene_0_error", "trait_error",
+    "seconds", "error"
+]
+
+
+def family_files(path):
+    """
+    Return the family CSV paths in directory `path`, or listed in the
+    manifest file `path`.
+    """
+    if os.path.isdir(path):
+        return sorted(
+            entry.path for entry in os.scandir(path)
+            if entry.name.endswith(".csv") and entry.is_file()
+        )
+    base = os.path.dirname(path)
+    files = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                files.append(os.path.join(base, line))
+    return files
+
+
+def score(task):
+    """
+    Return a result dict for a (path, engine, exact_max, samples, seed)
+    task, with an "error" instead of marginals if the family fails.
+    """
+    path, engine, exact_max, samples, seed = task
+    start = time.perf_counter()
+    result = {"file": path}
+    try:
+        people = load_data(path)
+        result["people"] = len(people)
+        errors = None
+        if engine == "auto":
+            engine = "exact" if len(people) <= exact_max else "gibbs"
+            if engine == "exact":
+                try:
+                    probabilities = ENGINES["exact"](people)
+                except ValueError:
+                    engine = "gibbs"
+        elif engine in ENGINES:
+            probabilities = ENGINES[engine](people)
+        if engine in SAMPLERS:
+            probabilities, errors, _ = sample(
+                people, PROBS, engine, samples, seed=seed
+            )
+    except (OSError, KeyError, ValueError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    else:
+        result["engine"] = engine
+        result["probabilities"] = probabilities
+        if errors is not None:
+            result["errors"] = errors
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def csv_rows(result):
+    """
+    Yield the CSV rows of a result: one per person, or one carrying
+    the error of a failed family.
+    """
+    if "error" in result:
+        yield {"file": result["file"], "error": result["error"],
+               "seconds": result["seconds"]}
+        return
+    errors = result.get("errors", {})
+    for person, marginals in result["probabilities"].items():
+        row = {
+            "file": result["file"],
+            "engine": result["engine"],
+            "person": person,
+            "trait": marginals["trait"][True],
+            "seconds": result["seconds"]
+        }
+        for g in (2, 1, 0):
+            row[f"gene_{g}"] = marginals["gene"][g]
+        if person in errors:
+            row["trait_error"] = errors[person]["trait"][True]
+            for g in (2, 1, 0):
+                row[f"gene_{g}_error"] = errors[person]["gene"][g]
+        yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python batch.py (DIRECTORY | MANIFEST) [--format {jsonl,csv}] "
+              "[--output FILE] [--workers N] [--engine ENGINE] "
+              "[--exact-max N] [--samples N] [--seed S]"
+    )
+    parser.add_argument("families")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--output", help="results file (default: stdout)")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="processes scoring families (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--engine", default="auto",
+        choices=["auto"] + sorted(ENGINES) + sorted(SAMPLERS),
+        help="engine for every family; auto picks by family size "
+             "(default: auto)"
+    )
+    parser.add_argument(
+        "--exact-max", type=int, default=EXACT_MAX,
+        help=f"largest family auto scores exactly (default: {EXACT_MAX})"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=SAMPLES,
+        help=f"draws for sampled families (default: {SAMPLES})"
+    )
+    parser.add_argument("--seed", type=int, help="sampler random seed")
+    args = parser.parse_args()
+
+    tasks = [
+        (path, args.engine, args.exact_max, args.samples, args.seed)
+        for path in family_files(args.families)
+    ]
+    out = (open(args.output, "w", newline="") if args.output
+           else sys.stdout)
+    if args.format == "csv":
+        writer = csv.DictWriter(out, CSV_FIELDS)
+        writer.writeheader()
+    pool = multiprocessing.Pool(args.workers) if args.workers > 1 else None
+    try:
+        results = (pool.imap_unordered(score, tasks) if pool
+                   else map(score, tasks))
+        failed = 0
+        for result in results:
+            failed += "error" in result
+            if args.format == "csv":
+                writer.writerows(csv_rows(result))
+            else:
+                out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if out is not sys.stdout:
+            out.close()
+    if failed:
+        print(f"{failed} of {len(tasks)} families failed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Exact pedigree inference by variable elimination.
+
+Every person's gene count is a variable with values 0, 1 and 2. Each
+person contributes one factor: the unconditional gene distribution for
+people without parents, or the inheritance table over their own and
+their parents' gene counts, multiplied by the probability of their
+trait if it is known. Unknown traits sum out to 1, so they need no
+factor; their marginals follow from the gene marginals.
+
+For each person, every other gene variable is summed out in a greedy
+min-fill order, the order that adds the fewest new edges between the
+variables left, found once for the whole pedigree. Factors then stay
+about as small as the pedigree's treewidth allows, so tree-like
+families take time polynomial in their size. Pedigrees so interbred
+that a factor would span more than MAX_WIDTH people are refused.
+"""
+
+import numpy as np
+
+# Gene counts, in the order of each factor's axes
+GENES = (0, 1, 2)
+
+# Most variables in one factor (3 ** 20 values take 28 GB)
+MAX_WIDTH = 16
+
+
+class Factor():
+    """
+    A table of non-negative values with one axis per variable.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = np.asarray(table, dtype=float)
+
+    def expand(self, variables):
+        """
+        Return the table with its axes in the order of `variables`, a
+        superset of this factor's, and size 1 along the missing ones.
+        """
+        order = [self.variables.index(v) for v in variables
+                 if v in self.variables]
+        shape = [3 if v in self.variables else 1 for v in variables]
+        return self.table.transpose(order).reshape(shape)
+
+    def sum_out(self, variable):
+        axis = self.variables.index(variable)
+        table = self.table.sum(axis=axis)
+
+        # Only relative values matter; rescale so products of many
+        # small probabilities do not underflow
+        largest = table.max()
+        if largest > 0:
+            table = table / largest
+        return Factor(self.variables[:axis] + self.variables[axis + 1:], table)
+
+
+def product(factors):
+    """
+    Return the product of `factors` as one Factor.
+    """
+    variables = []
+    for factor in factors:
+        variables.extend(v for v in factor.variables if v not in variables)
+    if len(variables) > MAX_WIDTH:
+        raise ValueError(
+            f"Pedigree too interbred for exact inference: a factor would "
+            f"span {len(variables)} people"
+        )
+    table = np.ones([3] * len(variables))
+    for factor in factors:
+        table = table * factor.expand(variables)
+    return Factor(variables, table)
+
+
+def transmission(probs):
+    """
+    Return the probability that a parent with each gene count passes
+    the gene on.
+    """
+    mutation = probs["mutation"]
+    return np.array([mutation, 0.5, 1 - mutation])
+
+
+def inheritance_table(probs):
+    """
+    Return the table of P(child genes | mother genes, father genes),
+    indexed [child, mother, father].
+    """
+    passes = transmission(probs)
+    mother = passes[:, None]
+    father = passes[None, :]
+    return np.stack([
+        (1 - mother) * (1 - father),
+        (1 - mother) * father + mother * (1 - father),
+        mother * father
+    ])
+
+
+def person_factors(people, probs):
+    """
+    Return one Factor per person over their gene count and, for people
+    with parents, their parents' gene counts.
+    """
+    prior = np.array([probs["gene"][g] for g in GENES])
+    inheritance = inheritance_table(probs)
+    factors = []
+    for person, data in people.items():
+        mother = data["mother"]
+        father = data["father"]
+        if mother is None:
+            factor = Factor([person], prior)
+        elif father is None:
+            # A missing father passes the gene on like one without it
+            factor = Factor([person, mother], inheritance[:, :, 0])
+        else:
+            factor = Factor([person, mother, father], inheritance)
+        if data["trait"] is not None:
+            likelihood = np.array([
+                probs["trait"][g][data["trait"]] for g in GENES
+            ])
+            # The person's own gene count is always the first axis
+            factor.table = factor.table * likelihood.reshape(
+                [-1] + [1] * (len(factor.variables) - 1)
+            )
+        factors.append(factor)
+    return factors
+
+
+def min_fill_order(factors):
+    """
+    Return an elimination order for the variables of `factors`,
+    greedily picking the one adding the fewest fill-in edges.
+    """
+    neighbors = {}
+    for factor in factors:
+        for v in factor.variables:
+            neighbors.setdefault(v, set()).update(factor.variables)
+    for v in neighbors:
+        neighbors[v].discard(v)
+
+    def fill(v):
+        adjacent = list(neighbors[v])
+        return sum(
+            1 for i, a in enumerate(adjacent) for b in adjacent[i + 1:]
+            if b not in neighbors[a]
+        )
+
+    order = []
+    remaining = set(neighbors)
+    while remaining:
+        v = min(remaining, key=lambda v: (fill(v), len(neighbors[v]), v))
+        adjacent = neighbors.pop(v)
+        for a in adjacent:
+            neighbors[a] |= adjacent - {a}
+            neighbors[a].discard(v)
+        remaining.remove(v)
+        order.append(v)
+    return order
+
+
+def eliminate(factors, order):
+    """
+    Sum the variables in `order` out of the product of `factors`, one
+    at a time, and return the factors left.
+
+    Each factor waits in the bucket of its first variable in `order`,
+    so summing a variable out only touches the factors in its bucket.
+    """
+    position = {v: i for i, v in enumerate(order)}
+    buckets = [[] for _ in order]
+    left = []
+
+    def place(factor):
+        positions = [position[v] for v in factor.variables if v in position]
+        if positions:
+            buckets[min(positions)].append(factor)
+        else:
+            left.append(factor)
+
+    for factor in factors:
+        place(factor)
+    for i, v in enumerate(order):
+        if buckets[i]:
+            place(product(buckets[i]).sum_out(v))
+    return left
+
+
+def gene_marginal(factors, person, order):
+    """
+    Return the posterior distribution of `person`'s gene count, summing
+    out the other variables in `order`.
+    """
+    left = product(eliminate(factors, [v for v in order if v != person]))
+    table = left.expand([person]).ravel()
+    return table / table.sum()
+
+
+def infer(people, probs):
+    """
+    Return the gene and trait marginals of every person in `people`,
+    as `load_data` returns them, given the known traits, in the form
+    of heredity's `probabilities` dict.
+    """
+    factors = person_factors(people, probs)
+    order = min_fill_order(factors)
+    probabilities = {}
+    for person, data in people.items():
+        genes = gene_marginal(factors, person, order)
+        if data["trait"] is None:
+            trait = sum(
+                genes[g] * probs["trait"][g][True] for g in GENES
+            )
+        else:
+            trait = 1.0 if data["trait"] else 0.0
+        probabilities[person] = {
+            "gene": {g: float(genes[g]) for g in reversed(GENES)},
+            "trait": {True: float(trait), False: float(1 - trait)}
+        }
+    return probabilities
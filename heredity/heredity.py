@@ -1,7 +1,13 @@
+import argparse
 import csv # a test set
 import itertools
+import math
 import sys
 
+from elimination import GENES, infer, inheritance_table
+from sampling import BURN_IN, CHAINS, SAMPLERS, SAMPLES, sample
+from vectorized import enumerate_arrays
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -38,11 +44,74 @@ PROBS = {
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        usage="python heredity.py data.csv "
+              "[--engine {exact,enumerate,vectorized,gibbs,weighting}] "
+              "[--samples N] [--burn-in N] [--chains N] [--workers N] "
+              "[--seed S]"
+    )
+    parser.add_argument("data")
+    parser.add_argument(
+        "--engine", choices=sorted(ENGINES) + sorted(SAMPLERS),
+        default="exact",
+        help="exact: variable elimination, polynomial for tree-like "
+             "families; enumerate: every assignment; vectorized: every "
+             "assignment, in NumPy blocks; gibbs: Gibbs sampling; "
+             "weighting: likelihood weighting (default: exact)"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=SAMPLES,
+        help=f"draws taken by the samplers (default: {SAMPLES})"
+    )
+    parser.add_argument(
+        "--burn-in", type=int, default=BURN_IN,
+        help=f"Gibbs sweeps discarded per chain (default: {BURN_IN})"
+    )
+    parser.add_argument(
+        "--chains", type=int, default=CHAINS,
+        help=f"independent sampler chains (default: {CHAINS})"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes running the chains (default: 1)"
+    )
+    parser.add_argument("--seed", type=int, help="sampler random seed")
+    args = parser.parse_args()
+    people = load_data(args.data)
+    if args.engine in SAMPLERS:
+        probabilities, errors, stats = sample(
+            people, PROBS, args.engine, args.samples, args.burn_in,
+            args.chains, args.workers, args.seed
+        )
+        print(
+            f"{stats['samples']} samples in {stats['seconds']:.2f}s, "
+            f"{stats['samples_per_second']:.0f} samples/s", file=sys.stderr
+        )
+    else:
+        probabilities = ENGINES[args.engine](people)
+        errors = None
+
+    # Print results
+
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if errors is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    error = errors[person][field][value]
+                    print(f"    {value}: {p:.4f} ± {error:.4f}")
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+
+def enumerate_probabilities(people):
+    """
+    Return the gene and trait distributions of every person by summing
+    the joint probability of every assignment consistent with the
+    known traits.
+    """
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -62,6 +131,8 @@ def main():
 
     # Loop over all sets of people who might have the trait
     names = set(people)
+    parents = parent_names(people)
+    scale = -math.inf
     for have_trait in powerset(names):
 
         # Check if current set of people violates known information
@@ -77,23 +148,32 @@ def main():
         for one_gene in powerset(names):
             for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
+                # Update probabilities with new joint probability, kept
+                # relative to the largest one so far so sums of tiny
+                # probabilities do not underflow
+                log_p = log_joint_probability(
+                    people, one_gene, two_genes, have_trait, parents
+                )
+                if log_p == -math.inf:
+                    continue
+                if log_p > scale:
+                    rescale(probabilities, math.exp(scale - log_p))
+                    scale = log_p
+                p = math.exp(log_p - scale)
                 update(probabilities, one_gene, two_genes, have_trait, p)
 
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
 
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+def exact_probabilities(people):
+    """
+    Return the same distributions as `enumerate_probabilities` by
+    variable elimination (see `elimination`).
+    """
+    return infer(people, PROBS)
 
 
 def load_data(filename):
@@ -130,6 +210,65 @@ def powerset(s):
     ]
 
 
+def factor_table(probs):
+    """
+    Return each person's factor in the joint probability, keyed by
+    (person genes, mother genes, father genes, trait). People without
+    parents have None for both parents' genes.
+
+    As in `elimination`, a missing father passes the gene on like one
+    without it, and anyone without a mother takes the unconditional
+    gene probabilities.
+    """
+    inheritance = inheritance_table(probs)
+    table = dict()
+    for genes in GENES:
+        for trait in (True, False):
+            trait_prop = probs["trait"][genes][trait]
+            table[genes, None, None, trait] = probs["gene"][genes] * trait_prop
+            for mother, father in itertools.product(GENES, repeat=2):
+                table[genes, mother, father, trait] = float(
+                    inheritance[genes, mother, father] * trait_prop
+                )
+            for parent in GENES:
+                table[genes, parent, None, trait] = (
+                    table[genes, parent, 0, trait]
+                )
+                table[genes, None, parent, trait] = (
+                    table[genes, None, None, trait]
+                )
+    return table
+
+
+# Per-person factors, and their logs, precomputed once from PROBS
+FACTORS = factor_table(PROBS)
+LOG_FACTORS = {
+    key: math.log(p) if p > 0 else -math.inf for key, p in FACTORS.items()
+}
+
+
+def parent_names(people):
+    """
+    Return a (person, mother, father) triple for everyone in `people`.
+    """
+    return [
+        (person, data["mother"], data["father"])
+        for person, data in people.items()
+    ]
+
+
+def gene_counts(people, one_gene, two_genes):
+    """
+    Return each person's number of copies of the gene in an assignment,
+    with None mapped to None for missing parents.
+    """
+    counts = {None: None}
+    for person in people:
+        counts[person] = (1 if person in one_gene else
+                          2 if person in two_genes else 0)
+    return counts
+
+
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
     Compute and return a joint probability.
@@ -140,44 +279,33 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone not in `one_gene` or `two_gene` does not have the gene, and
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
+
+    Each person contributes one factor looked up in FACTORS. For large
+    families the product underflows; use `log_joint_probability`.
     """
+    counts = gene_counts(people, one_gene, two_genes)
     probability = 1
+    for person, data in people.items():
+        probability *= FACTORS[counts[person], counts[data["mother"]],
+                               counts[data["father"]], person in have_trait]
+    return probability
 
-    for person in people:
-        gene_number = 1 if person in one_gene else 2 if person in two_genes else 0
-        trait = True if person in have_trait else False
-
-        gene_numb_prop = PROBS['gene'][gene_number]
-        trait_prop = PROBS['trait'][gene_number][trait]
-
-        if people[person]['mother'] is None:
-            # no parents, use probability distribution
-            probability *= gene_numb_prop * trait_prop
-        else:
-            # info about parents is available
-            mother = people[person]['mother']
-            father = people[person]['father']
-            percentages = {}
-
-            for ppl in [mother, father]:
-                number = 1 if ppl in one_gene else 2 if ppl in two_genes else 0
-                perc = 0 + PROBS['mutation'] if number == 0 else 0.5 if number == 1 else 1 - PROBS['mutation']
-                percentages[ppl] = perc
-
-            if gene_number == 0:
-                # 0, none of parents gave gene
-                probability *= (1 - percentages[mother]) * (1 - percentages[father])
-            elif gene_number == 1:
-                # 1, one of parents gave gene
-                probability *= (1 - percentages[mother]) * percentages[father] + percentages[mother] * (
-                            1 - percentages[father])
-            else:
-                # 2, both of parents gave gene
-                probability *= percentages[mother] * percentages[father]
-
-            probability *= trait_prop
 
-    return probability
+def log_joint_probability(people, one_gene, two_genes, have_trait,
+                          parents=None):
+    """
+    Return the natural log of `joint_probability`, as a sum of
+    LOG_FACTORS lookups that cannot underflow. `parents` may give
+    `parent_names(people)` computed once for many assignments.
+    """
+    if parents is None:
+        parents = parent_names(people)
+    counts = gene_counts(people, one_gene, two_genes)
+    log_p = 0
+    for person, mother, father in parents:
+        log_p += LOG_FACTORS[counts[person], counts[mother], counts[father],
+                             person in have_trait]
+    return log_p
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -208,6 +336,16 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
             probabilities[person]["gene"][0] += p
             probabilities[person]["trait"][False] += p
 
+def rescale(probabilities, factor):
+    """
+    Multiply every value in `probabilities` by `factor`.
+    """
+    for person in probabilities:
+        for field in probabilities[person]:
+            for value in probabilities[person][field]:
+                probabilities[person][field][value] *= factor
+
+
 def normalize(probabilities):
     """
     Update `probabilities` such that each probability distribution
@@ -222,6 +360,21 @@ def normalize(probabilities):
         probabilities[person]['trait'][True] /= sum_traits
         probabilities[person]['trait'][False] /= sum_traits
 
+def vectorized_probabilities(people):
+    """
+    Return the same distributions as `enumerate_probabilities` by
+    enumerating gene assignments in NumPy blocks (see `vectorized`).
+    """
+    return enumerate_arrays(people, PROBS)
+
+
+ENGINES = {
+    "exact": exact_probabilities,
+    "enumerate": enumerate_probabilities,
+    "vectorized": vectorized_probabilities
+}
+
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,276 @@
+"""
+Approximate heredity inference by sampling.
+
+Both samplers draw gene counts only. An unknown trait is never sampled:
+each draw instead contributes the probability of the trait given the
+drawn gene count, which has lower variance and the same expectation.
+
+Gibbs sampling sweeps the people in turn, redrawing each one's gene
+count from its distribution given everyone else's: the person's own
+factor (gene prior, or inheritance from the parents' drawn counts),
+the likelihood of a known trait, and the inheritance factor of each of
+the person's children. Likelihood weighting draws whole families from
+the prior, parents before children, and weights each draw by the
+likelihood of the known traits; it needs no burn-in and vectorizes over
+draws, but degrades when the evidence is unlikely.
+
+Work is split into `chains` independent chains, each with its own
+random stream spawned from `seed`, run on `workers` processes, so
+results depend on the seed and chain count but not the worker count.
+Each chain's draws are cut into BATCHES batches; Monte Carlo standard
+errors are the spread of the batch estimates, which allows for the
+correlation between successive Gibbs sweeps.
+"""
+
+import multiprocessing
+import time
+
+import numpy as np
+
+from elimination import GENES, inheritance_table
+from vectorized import family_arrays
+
+SAMPLES = 10000
+BURN_IN = 500
+CHAINS = 4
+
+# Batches per chain for batch-means standard errors
+BATCHES = 10
+
+
+class Model():
+    """
+    The pedigree and `PROBS` as arrays, with each person's children.
+    """
+
+    def __init__(self, people, probs):
+        self.n = len(people)
+        (self.mothers, self.fathers, self.founders, self.known,
+         self.likelihood) = family_arrays(people, probs)
+        self.prior = np.array([probs["gene"][g] for g in GENES])
+        self.inheritance = inheritance_table(probs)
+        self.has_trait = np.array([probs["trait"][g][True] for g in GENES])
+
+        # (child, other parent, is mother) for every child of each person
+        self.children = [[] for _ in range(self.n)]
+        for child in range(self.n):
+            if not self.founders[child]:
+                mother = self.mothers[child]
+                father = self.fathers[child]
+                self.children[mother].append((child, father, True))
+                if father < self.n:
+                    self.children[father].append((child, mother, False))
+
+        self.order = topological_order(self.mothers, self.fathers,
+                                       self.founders)
+
+
+def topological_order(mothers, fathers, founders):
+    """
+    Return the people's indexes with parents before their children.
+    """
+    n = len(mothers)
+    order = []
+    placed = np.zeros(n + 1, dtype=bool)
+    placed[n] = True
+    visiting = set()
+
+    def visit(i):
+        if placed[i]:
+            return
+        if i in visiting:
+            raise ValueError("Pedigree has a person among their own ancestors")
+        visiting.add(i)
+        if not founders[i]:
+            visit(mothers[i])
+            visit(fathers[i])
+        visiting.discard(i)
+        placed[i] = True
+        order.append(i)
+
+    for i in range(n):
+        visit(i)
+    return order
+
+
+def batch_bounds(samples):
+    return np.linspace(0, samples, min(BATCHES, samples) + 1).astype(int)
+
+
+def gibbs_chain(task):
+    """
+    Run one Gibbs chain and return per-batch (weights, gene sums, trait
+    sums) for a (model, samples, burn_in, seed) task.
+    """
+    model, samples, burn_in, seed = task
+    rng = np.random.default_rng(seed)
+    n = model.n
+    inheritance = model.inheritance
+
+    # Start from a draw of the prior, with a zero-copy missing parent
+    genes = np.zeros(n + 1, dtype=np.int64)
+    for i in model.order:
+        genes[i] = draw_person(model, genes, i, rng)
+
+    bounds = batch_bounds(samples)
+    weights = np.diff(bounds).astype(float)
+    gene_sums = np.zeros((len(weights), n, 3))
+    trait_sums = np.zeros((len(weights), n))
+    people_index = np.arange(n)
+    batch = 0
+    for sweep in range(burn_in + samples):
+        uniforms = rng.random(n)
+        for i in range(n):
+            if model.founders[i]:
+                p = model.prior.copy()
+            else:
+                p = inheritance[:, genes[model.mothers[i]],
+                                genes[model.fathers[i]]].copy()
+            p *= model.likelihood[i]
+            for child, other, is_mother in model.children[i]:
+                if is_mother:
+                    p *= inheritance[genes[child], :, genes[other]]
+                else:
+                    p *= inheritance[genes[child], genes[other], :]
+            cumulative = np.cumsum(p)
+            genes[i] = min(2, np.searchsorted(
+                cumulative, uniforms[i] * cumulative[-1], "right"
+            ))
+        if sweep < burn_in:
+            continue
+        drawn = sweep - burn_in
+        while drawn >= bounds[batch + 1]:
+            batch += 1
+        own = genes[:n]
+        gene_sums[batch, people_index, own] += 1
+        trait_sums[batch] += model.has_trait[own]
+    return weights, gene_sums, trait_sums
+
+
+def draw_person(model, genes, i, rng):
+    """
+    Draw person `i`'s gene count given their parents' in `genes`.
+    """
+    if model.founders[i]:
+        p = model.prior
+    else:
+        p = model.inheritance[:, genes[model.mothers[i]],
+                              genes[model.fathers[i]]]
+    return rng.choice(3, p=p / p.sum())
+
+
+def weighting_chain(task):
+    """
+    Draw one chain of likelihood-weighted samples and return per-batch
+    (weights, gene sums, trait sums) for a (model, samples, burn_in,
+    seed) task; `burn_in` is unused.
+    """
+    model, samples, _, seed = task
+    rng = np.random.default_rng(seed)
+    n = model.n
+    genes = np.zeros((samples, n + 1), dtype=np.int64)
+    weights = np.ones(samples)
+    for i in model.order:
+        if model.founders[i]:
+            p = np.broadcast_to(model.prior, (samples, 3))
+        else:
+            p = model.inheritance[
+                :, genes[:, model.mothers[i]], genes[:, model.fathers[i]]
+            ].T
+        cumulative = np.cumsum(p, axis=1)
+        genes[:, i] = np.minimum(2, (
+            rng.random((samples, 1)) * cumulative[:, -1:] >= cumulative
+        ).sum(axis=1))
+        if model.known[i]:
+            weights *= model.likelihood[i][genes[:, i]]
+
+    bounds = batch_bounds(samples)
+    own = genes[:, :n]
+    batches = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+    bins = (batches[:, None] * n + np.arange(n)) * 3 + own
+    gene_sums = np.bincount(
+        bins.ravel(),
+        weights=np.broadcast_to(weights[:, None], own.shape).ravel(),
+        minlength=(len(bounds) - 1) * n * 3
+    ).reshape(len(bounds) - 1, n, 3)
+    trait_sums = np.zeros((len(bounds) - 1, n))
+    np.add.at(trait_sums, batches, weights[:, None] * model.has_trait[own])
+    batch_weights = np.bincount(batches, weights=weights,
+                                minlength=len(bounds) - 1)
+    return batch_weights, gene_sums, trait_sums
+
+
+SAMPLERS = {
+    "gibbs": gibbs_chain,
+    "weighting": weighting_chain
+}
+
+
+def sample(people, probs, method="gibbs", samples=SAMPLES, burn_in=BURN_IN,
+           chains=CHAINS, workers=1, seed=None):
+    """
+    Return (probabilities, errors, stats) estimated by `method` from
+    `samples` draws split across `chains`.
+
+    `probabilities` is in the form of heredity's dict, `errors` holds
+    the Monte Carlo standard error of each value in the same form, and
+    `stats` has the "samples", "seconds" and "samples_per_second".
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"Unknown sampler: {method}")
+    model = Model(people, probs)
+    chains = max(1, min(chains, samples))
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    tasks = [
+        (model, samples // chains + (c < samples % chains), burn_in, seeds[c])
+        for c in range(chains)
+    ]
+    start = time.perf_counter()
+    if workers > 1 and chains > 1:
+        with multiprocessing.Pool(min(workers, chains)) as pool:
+            results = pool.map(SAMPLERS[method], tasks)
+    else:
+        results = list(map(SAMPLERS[method], tasks))
+    seconds = time.perf_counter() - start
+
+    weights = np.concatenate([r[0] for r in results])
+    gene_sums = np.concatenate([r[1] for r in results])
+    trait_sums = np.concatenate([r[2] for r in results])
+    if weights.sum() == 0:
+        raise ValueError("No sample is consistent with the known traits")
+    genes = gene_sums.sum(axis=0) / weights.sum()
+    traits = trait_sums.sum(axis=0) / weights.sum()
+
+    # Batch means: the spread of the per-batch estimates
+    usable = weights > 0
+    batches = usable.sum()
+    if batches > 1:
+        gene_errors = (gene_sums[usable] / weights[usable, None, None]).std(
+            axis=0, ddof=1) / np.sqrt(batches)
+        trait_errors = (trait_sums[usable] / weights[usable, None]).std(
+            axis=0, ddof=1) / np.sqrt(batches)
+    else:
+        gene_errors = np.full(genes.shape, np.nan)
+        trait_errors = np.full(traits.shape, np.nan)
+
+    probabilities = {}
+    errors = {}
+    for i, (person, data) in enumerate(people.items()):
+        if data["trait"] is not None:
+            traits[i] = 1.0 if data["trait"] else 0.0
+            trait_errors[i] = 0.0
+        probabilities[person] = {
+            "gene": {g: float(genes[i, g]) for g in reversed(GENES)},
+            "trait": {True: float(traits[i]), False: float(1 - traits[i])}
+        }
+        errors[person] = {
+            "gene": {g: float(gene_errors[i, g]) for g in reversed(GENES)},
+            "trait": {True: float(trait_errors[i]),
+                      False: float(trait_errors[i])}
+        }
+    stats = {
+        "samples": samples,
+        "seconds": seconds,
+        "samples_per_second": samples / max(seconds, 1e-9)
+    }
+    return probabilities, errors, stats
@@ -0,0 +1,24 @@
+import pytest
+
+from heredity import ENGINES, load_data
+
+
+def test_engines_agree_on_a_missing_parent(tmp_path):
+    path = tmp_path / "family.csv"
+    path.write_text(
+        "name,mother,father,trait\n"
+        "Ann,,,1\n"
+        "Bob,Ann,,\n"
+        "Cal,,Bob,0\n"
+        "Dee,Bob,,1\n"
+    )
+    people = load_data(path)
+    exact = ENGINES["exact"](people)
+    for engine in ("enumerate", "vectorized"):
+        probabilities = ENGINES[engine](people)
+        for person, fields in exact.items():
+            for field, values in fields.items():
+                for value, p in values.items():
+                    assert probabilities[person][field][value] == (
+                        pytest.approx(p)
+                    )
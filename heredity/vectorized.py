@@ -0,0 +1,107 @@
+"""
+Vectorized brute-force enumeration for small families.
+
+Every assignment of gene counts to the N people is a base-3 integer
+whose digits are the counts; a block of consecutive integers decodes to
+a (block, N) array of digits at once. Each person's factor for a whole
+block is one gathered lookup: the unconditional gene table for people
+without parents, or the inheritance table indexed by the person's and
+the parents' digits, times the likelihood of a known trait. The joint
+probabilities are the row products, and the marginals are reduced with
+`np.bincount` over (person, gene count) bins.
+
+Unknown traits need no enumeration of their own: summed over both
+values they contribute a factor of 1, and the trait marginal of such a
+person is the joint weighted by the probability of the trait given
+their gene count. This gives the same sums as enumerating every set of
+people having the trait, 2 ** (unknown traits) times faster.
+"""
+
+import numpy as np
+
+from elimination import GENES, inheritance_table
+
+# Gene count digits decoded at a time (assignments * people)
+BLOCK = 1 << 20
+
+
+def family_arrays(people, probs):
+    """
+    Return (mothers, fathers, founders, known, likelihood) arrays over
+    the people in `people`'s order. A missing father is index N, a
+    placeholder always decoded as having no copies of the gene.
+    """
+    index = {person: i for i, person in enumerate(people)}
+    n = len(people)
+    mothers = np.full(n, n)
+    fathers = np.full(n, n)
+    founders = np.zeros(n, dtype=bool)
+    known = np.zeros(n, dtype=bool)
+    likelihood = np.ones((n, 3))
+    for i, data in enumerate(people.values()):
+        if data["mother"] is None:
+            founders[i] = True
+        else:
+            mothers[i] = index[data["mother"]]
+            if data["father"] is not None:
+                fathers[i] = index[data["father"]]
+        if data["trait"] is not None:
+            known[i] = True
+            likelihood[i] = [probs["trait"][g][data["trait"]] for g in GENES]
+    return mothers, fathers, founders, known, likelihood
+
+
+def enumerate_arrays(people, probs, block=BLOCK):
+    """
+    Return the gene and trait distributions of every person, as
+    `enumerate_probabilities` does, enumerating gene assignments a
+    block at a time.
+    """
+    n = len(people)
+    mothers, fathers, founders, known, likelihood = family_arrays(
+        people, probs
+    )
+    prior = np.array([probs["gene"][g] for g in GENES])
+    inheritance = inheritance_table(probs)
+    has_trait = np.array([probs["trait"][g][True] for g in GENES])
+    people_index = np.arange(n)
+    powers = 3 ** np.arange(n, dtype=np.int64)
+
+    genes = np.zeros(3 * n)
+    traits = np.zeros(n)
+    step = max(1, block // max(n, 1))
+    total = 3 ** n
+    for start in range(0, total, step):
+        codes = np.arange(start, min(start + step, total), dtype=np.int64)
+        digits = np.zeros((len(codes), n + 1), dtype=np.int64)
+        digits[:, :n] = codes[:, None] // powers % 3
+        own = digits[:, :n]
+
+        factors = np.where(
+            founders,
+            prior[own],
+            inheritance[own, digits[:, mothers], digits[:, fathers]]
+        )
+        factors *= likelihood[people_index, own]
+        joint = factors.prod(axis=1)
+
+        weights = np.broadcast_to(joint[:, None], own.shape)
+        genes += np.bincount(
+            (people_index * 3 + own).ravel(), weights=weights.ravel(),
+            minlength=3 * n
+        )
+        traits += (weights * has_trait[own]).sum(axis=0)
+
+    genes = genes.reshape(n, 3)
+    totals = genes.sum(axis=1)
+    probabilities = {}
+    for i, (person, data) in enumerate(people.items()):
+        if known[i]:
+            trait = 1.0 if data["trait"] else 0.0
+        else:
+            trait = traits[i] / totals[i]
+        probabilities[person] = {
+            "gene": {g: float(genes[i, g] / totals[i]) for g in reversed(GENES)},
+            "trait": {True: float(trait), False: float(1 - trait)}
+        }
+    return probabilities
@@ -0,0 +1,274 @@
+"""
+Benchmark PageRank crawling, sampling and iteration on synthetic graphs.
+
+Usage: python benchmark.py [--graphs NAME ...] [--sizes N ...]
+       [--degree D] [--samples N] [--html MAX] [--workers N]
+       [--tolerance T] [--seed S] [--output FILE]
+
+For every graph kind and size a random link graph is generated, and the
+time to build its link matrix is measured. `sample_pagerank` and
+`iterate_pagerank` are then timed on it as a `crawl` style dict, as
+callers use them, including the conversion to and from the link matrix
+("sample_seconds" and "iterate_seconds"). The `visit_counts` and
+`power_iteration` kernels they wrap are timed on their own too
+("visit_counts_seconds" and "power_iteration_seconds"). The L1 distance
+of the sampled and iterated ranks from ranks iterated to a far tighter
+tolerance is reported as well. Graphs of up to `--html` pages are also
+written out as a directory of HTML pages and crawled, to time the
+crawler. Results are printed and written to a JSON file, so runs can be
+compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from crawler import crawl_matrix
+from linkmatrix import TOLERANCE, LinkMatrix, power_iteration
+from pagerank import iterate_pagerank, sample_pagerank
+from sampler import visit_counts
+
+DAMPING = 0.85
+SIZES = [100, 1000, 10000, 100000, 1000000]
+
+# Mean number of links per page
+DEGREE = 8
+
+# Tolerance of the ranks that errors are measured against
+REFERENCE_TOLERANCE = 1e-12
+
+# Largest graph written out as HTML and crawled by default
+HTML_MAX = 10000
+
+
+def erdos_renyi(n, degree, rng):
+    """
+    Return (sources, targets) of links chosen uniformly at random.
+    """
+    links = n * degree
+    return rng.integers(0, n, links), rng.integers(0, n, links)
+
+
+def power_law(n, degree, rng, exponent=2.1):
+    """
+    Return (sources, targets) of links whose in- and out-degrees follow
+    power laws with the given exponent, as on the web.
+    """
+    links = n * degree
+    weights = np.arange(1, n + 1, dtype=float) ** (-1 / (exponent - 1))
+    weights /= weights.sum()
+    sources = rng.choice(n, links, p=weights)
+    targets = rng.permutation(n)[rng.choice(n, links, p=weights)]
+    return sources, targets
+
+
+def dangling_heavy(n, degree, rng, dangling=0.5):
+    """
+    Return (sources, targets) of random links from all but a `dangling`
+    fraction of the pages, which are left without links.
+    """
+    linking = max(1, int(n * (1 - dangling)))
+    links = n * degree
+    return rng.integers(0, linking, links), rng.integers(0, n, links)
+
+
+GENERATORS = {
+    "erdos-renyi": erdos_renyi,
+    "power-law": power_law,
+    "dangling": dangling_heavy
+}
+
+
+def page_names(n):
+    return [f"{i}.html" for i in range(n)]
+
+
+def corpus_dict(links):
+    """
+    Return the LinkMatrix `links` as a `crawl` style dict of page ->
+    set of linked pages.
+    """
+    corpus = {page: set() for page in links.pages}
+    for source, target in zip(*(e.tolist() for e in links.edges())):
+        corpus[links.pages[source]].add(links.pages[target])
+    return corpus
+
+
+def write_corpus(directory, links):
+    """
+    Write the LinkMatrix `links` out as a directory of HTML pages.
+    """
+    sources, targets = links.edges()
+    order = np.argsort(sources, kind="stable")
+    sources = sources[order]
+    targets = targets[order]
+    bounds = np.searchsorted(sources, np.arange(links.size + 1))
+    for i, page in enumerate(links.pages):
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<html><head><title>{page}</title></head><body>\n")
+            for target in targets[bounds[i]:bounds[i + 1]].tolist():
+                f.write(f'<p><a href="{links.pages[target]}">'
+                        f'{links.pages[target]}</a></p>\n')
+            f.write("</body></html>\n")
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def l1_error(ranks, links, reference):
+    """
+    Return the L1 distance of a dict of page ranks from the `reference`
+    rank vector of `links`.
+    """
+    values = np.array([ranks[page] for page in links.pages])
+    return float(np.abs(values - reference).sum())
+
+
+def benchmark(kind, n, degree=DEGREE, samples=None, html=False, workers=1,
+              seed=None, tolerance=TOLERANCE):
+    """
+    Return a dict of timings and accuracy for one synthetic graph.
+    `samples` defaults to 100 per page.
+    """
+    rng = np.random.default_rng(seed)
+    samples = samples or 100 * n
+    sources, targets = GENERATORS[kind](n, degree, rng)
+    links, build = timed(
+        LinkMatrix.from_edges, page_names(n), sources, targets
+    )
+    result = {
+        "graph": kind,
+        "pages": n,
+        "links": int(links.matrix.nnz),
+        "dangling": int(links.dangling.sum()),
+        "samples": samples,
+        "build_seconds": build
+    }
+
+    if html:
+        directory = tempfile.mkdtemp(prefix="pagerank-benchmark-")
+        try:
+            write_corpus(directory, links)
+            crawled, result["crawl_seconds"] = timed(
+                crawl_matrix, directory, workers
+            )
+        finally:
+            shutil.rmtree(directory)
+        if crawled.matrix.nnz != links.matrix.nnz:
+            raise RuntimeError(f"Crawled {crawled.matrix.nnz} links, "
+                               f"expected {links.matrix.nnz}")
+
+    corpus = corpus_dict(links)
+    sampled, result["sample_seconds"] = timed(
+        sample_pagerank, corpus, DAMPING, samples, seed=seed
+    )
+    iterated, result["iterate_seconds"] = timed(
+        iterate_pagerank, corpus, DAMPING, tolerance
+    )
+    del corpus
+    _, result["visit_counts_seconds"] = timed(
+        visit_counts, links, DAMPING, samples, seed=seed
+    )
+    (_, iterations), result["power_iteration_seconds"] = timed(
+        power_iteration, links, DAMPING, tolerance
+    )
+    reference, _ = power_iteration(links, DAMPING, REFERENCE_TOLERANCE)
+    result["iterations"] = iterations
+    result["sample_l1_error"] = l1_error(sampled, links, reference)
+    result["iterate_l1_error"] = l1_error(iterated, links, reference)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [--graphs NAME ...] [--sizes N ...] "
+              "[--degree D] [--samples N] [--html MAX] [--workers N] "
+              "[--tolerance T] [--seed S] [--output FILE]"
+    )
+    parser.add_argument(
+        "--graphs", nargs="+", choices=sorted(GENERATORS),
+        default=list(GENERATORS), help="graph kinds (default: all)"
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, default=SIZES,
+        help="numbers of pages (default: 10^2 to 10^6)"
+    )
+    parser.add_argument(
+        "--degree", type=int, default=DEGREE,
+        help=f"mean links per page (default: {DEGREE})"
+    )
+    parser.add_argument(
+        "--samples", type=int,
+        help="samples taken by sampling (default: 100 per page)"
+    )
+    parser.add_argument(
+        "--html", type=int, default=HTML_MAX, metavar="MAX",
+        help="crawl graphs of up to MAX pages written out as HTML "
+             f"(default: {HTML_MAX})"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes crawling the HTML pages (default: 1)"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=TOLERANCE,
+        help=f"tolerance of the timed iteration (default: {TOLERANCE})"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", default="benchmark.json",
+        help="JSON results file (default: benchmark.json)"
+    )
+    args = parser.parse_args()
+
+    results = []
+    for kind in args.graphs:
+        for n in args.sizes:
+            result = benchmark(
+                kind, n, args.degree, args.samples, n <= args.html,
+                args.workers, args.seed, args.tolerance
+            )
+            results.append(result)
+            crawl = result.get("crawl_seconds")
+            print(
+                f"{kind} {n} pages, {result['links']} links: "
+                f"build {result['build_seconds']:.3f}s, "
+                + (f"crawl {crawl:.3f}s, " if crawl is not None else "")
+                + f"sample {result['sample_seconds']:.3f}s "
+                f"(visit_counts {result['visit_counts_seconds']:.3f}s), "
+                f"iterate {result['iterate_seconds']:.3f}s "
+                f"(power_iteration {result['power_iteration_seconds']:.3f}s, "
+                f"{result['iterations']} iterations), "
+                f"L1 error sampling {result['sample_l1_error']:.4f}, "
+                f"iterating {result['iterate_l1_error']:.4f}"
+            )
+            sys.stdout.flush()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "damping": DAMPING,
+        "degree": args.degree,
+        "tolerance": args.tolerance,
+        "seed": args.seed,
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Incremental crawling with an on-disk link cache.
+
+The hrefs extracted from every page are saved in a JSON cache in the
+corpus directory together with the file's size and mtime. Later crawls
+re-parse only the files that were added or whose size or mtime changed,
+drop deleted ones, and patch the link graph in place rather than
+rebuilding it.
+"""
+
+import json
+import multiprocessing
+import os
+
+from crawler import CHUNKSIZE, page_links
+
+CACHE_NAME = ".pagerank-links.json"
+VERSION = 1
+
+
+class LinkGraph():
+    """
+    A corpus kept consistent under page additions, changes and removals.
+
+    `corpus` maps each page to the other pages it links to, as `crawl`
+    returns. The raw hrefs of every page and a reverse index from href
+    to the pages using it let a change touch only the affected entries.
+    """
+
+    def __init__(self):
+        self.corpus = {}
+        self.hrefs = {}
+        self.referrers = {}
+
+    def set_links(self, page, hrefs):
+        """
+        Add `page`, or replace its links, with the raw `hrefs` it contains.
+        """
+        if page in self.hrefs:
+            self.forget_hrefs(page)
+        is_new = page not in self.corpus
+        self.hrefs[page] = set(hrefs)
+        for href in self.hrefs[page]:
+            self.referrers.setdefault(href, set()).add(page)
+        self.corpus[page] = {
+            href for href in self.hrefs[page]
+            if href in self.corpus and href != page
+        }
+        if is_new:
+            # Existing pages that linked to this page before it existed
+            for referrer in self.referrers.get(page, ()):
+                if referrer != page:
+                    self.corpus[referrer].add(page)
+
+    def remove(self, page):
+        """
+        Remove `page` and every link to it.
+        """
+        self.forget_hrefs(page)
+        del self.hrefs[page]
+        del self.corpus[page]
+        for referrer in self.referrers.get(page, ()):
+            self.corpus[referrer].discard(page)
+
+    def forget_hrefs(self, page):
+        for href in self.hrefs[page]:
+            referrers = self.referrers[href]
+            referrers.discard(page)
+            if not referrers:
+                del self.referrers[href]
+
+
+def file_stats(directory):
+    """
+    Return a dict of HTML file name -> [size, mtime] for `directory`.
+    """
+    stats = {}
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".html") and entry.is_file():
+            stat = entry.stat()
+            stats[entry.name] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def read_cache(path):
+    """
+    Return the cached {name: {"stat", "hrefs"}} entries at `path`, or
+    an empty dict if there is no usable cache.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != VERSION:
+        return {}
+    return cache["files"]
+
+
+def write_cache(path, stats, graph):
+    files = {
+        name: {"stat": stats[name], "hrefs": sorted(graph.hrefs[name])}
+        for name in graph.hrefs
+    }
+    temporary = f"{path}.tmp{os.getpid()}"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION, "files": files}, f)
+    os.replace(temporary, path)
+
+
+def incremental_crawl(directory, workers=1, graph=None):
+    """
+    Crawl `directory`, re-parsing only files that changed since the
+    cached crawl, and update the cache.
+
+    Pass the LinkGraph of a previous call as `graph` to patch it in
+    place; otherwise one is rebuilt from the cache. Returns the graph
+    and a dict counting "parsed", "reused" and "removed" files.
+    """
+    path = os.path.join(directory, CACHE_NAME)
+    cached = read_cache(path)
+    stats = file_stats(directory)
+
+    if graph is None:
+        graph = LinkGraph()
+        for name in sorted(cached):
+            if name in stats and cached[name]["stat"] == stats[name]:
+                graph.set_links(name, cached[name]["hrefs"])
+        removed = [name for name in cached if name not in stats]
+    else:
+        removed = [name for name in graph.corpus if name not in stats]
+        for name in removed:
+            graph.remove(name)
+
+    stale = sorted(
+        name for name in stats
+        if name not in graph.corpus
+        or name not in cached or cached[name]["stat"] != stats[name]
+    )
+    paths = [os.path.join(directory, name) for name in stale]
+    if workers > 1 and len(paths) > 1:
+        with multiprocessing.Pool(workers) as pool:
+            parsed = pool.map(page_links, paths, chunksize=CHUNKSIZE)
+    else:
+        parsed = map(page_links, paths)
+    for name, hrefs in zip(stale, parsed):
+        graph.set_links(name, hrefs)
+
+    try:
+        write_cache(path, stats, graph)
+    except OSError:
+        pass
+    counts = {
+        "parsed": len(stale),
+        "reused": len(stats) - len(stale),
+        "removed": len(removed)
+    }
+    return graph, counts
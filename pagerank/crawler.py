@@ -0,0 +1,179 @@
+"""
+Parallel, streaming crawl of a directory of HTML pages.
+
+Page names are interned to integer indexes up front. A process pool
+then scans the files, each fed a block at a time through an incremental
+HTML tokenizer that collects the href of every <a> tag, so no file is
+ever held in memory whole. Workers return the indexes of the corpus
+pages each file links to, and the resulting edge list goes straight
+into a LinkMatrix without building a dict of sets.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from html.parser import HTMLParser
+
+from linkmatrix import LinkMatrix
+
+# Characters of a file fed to the tokenizer at a time
+BLOCK_SIZE = 1 << 16
+
+# Files handed to a worker at a time
+CHUNKSIZE = 64
+
+# Page name -> index table installed in each worker by init_worker
+page_index = None
+
+
+class LinkParser(HTMLParser):
+    """
+    Incremental tokenizer collecting the href of every <a> tag.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value is not None:
+                    self.links.add(value)
+
+
+def list_pages(directory):
+    """
+    Return the sorted names of the HTML pages in `directory`.
+    """
+    return sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html") and entry.is_file()
+    )
+
+
+def page_links(path):
+    """
+    Return the set of hrefs of <a> tags in the HTML file at `path`,
+    reading it a block at a time.
+    """
+    parser = LinkParser()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            parser.feed(block)
+    parser.close()
+    return parser.links
+
+
+def init_worker(pages):
+    global page_index
+    page_index = pages
+
+
+def scan(task):
+    """
+    Return (source, targets, size) for a (source index, path) task:
+    the indexes of the other corpus pages the file links to, and the
+    file's size in bytes.
+    """
+    source, path = task
+    targets = array("i", sorted({
+        page_index[link] for link in page_links(path)
+        if link in page_index and page_index[link] != source
+    }))
+    return source, targets, os.path.getsize(path)
+
+
+def crawl_edges(directory, workers=1, progress=False):
+    """
+    Return (pages, sources, targets): the sorted page names of
+    `directory` and parallel arrays of the links between them as
+    page indexes. With `progress`, throughput is reported on stderr.
+    """
+    pages = list_pages(directory)
+    sources = array("i")
+    targets = array("i")
+    for source, links in scan_pages(directory, pages, workers, progress):
+        sources.extend(array("i", [source]) * len(links))
+        targets.extend(links)
+    return pages, sources, targets
+
+
+def scan_pages(directory, pages, workers=1, progress=False):
+    """
+    Yield (source, targets) for each of the `pages` of `directory`,
+    in no particular order, with the index of the page and an array of
+    the indexes of the pages it links to.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    tasks = (
+        (i, os.path.join(directory, page)) for i, page in enumerate(pages)
+    )
+    if workers > 1:
+        pool = multiprocessing.Pool(
+            workers, initializer=init_worker, initargs=(index,)
+        )
+        results = pool.imap_unordered(scan, tasks, chunksize=CHUNKSIZE)
+    else:
+        pool = None
+        init_worker(index)
+        results = map(scan, tasks)
+
+    reporter = Reporter(len(pages)) if progress else None
+    try:
+        for source, links, size in results:
+            yield source, links
+            if reporter:
+                reporter.update(size)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if reporter:
+        reporter.finish()
+
+
+def crawl_matrix(directory, workers=1, progress=False):
+    """
+    Crawl `directory` in parallel straight into a LinkMatrix.
+    """
+    return LinkMatrix.from_edges(*crawl_edges(directory, workers, progress))
+
+
+class Reporter():
+    """
+    Reports files and bytes scanned per second on stderr, at most
+    once a second.
+    """
+
+    def __init__(self, total_files):
+        self.total_files = total_files
+        self.files = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def update(self, size):
+        self.files += 1
+        self.bytes += size
+        now = time.perf_counter()
+        if now - self.last >= 1:
+            self.last = now
+            self.report(now)
+
+    def report(self, now):
+        elapsed = max(now - self.start, 1e-9)
+        print(
+            f"{self.files}/{self.total_files} files, "
+            f"{self.files / elapsed:.0f} files/s, "
+            f"{self.bytes / elapsed / 1e6:.1f} MB/s",
+            file=sys.stderr
+        )
+
+    def finish(self):
+        self.report(time.perf_counter())
@@ -0,0 +1,304 @@
+"""
+Incremental PageRank updates after link changes.
+
+PageRank solves rank = d * P @ rank + (1 - d) / N, where P is the link
+matrix with dangling pages leading everywhere. For any rank vector the
+residual
+
+    residual = d * P @ rank + (1 - d) / N - rank
+
+is exactly the change one more power iteration would make. When links
+change, the residual of the previous solution only changes in the
+columns of the pages whose links changed. Pushing residual mass from
+the pages holding too much of it (Gauss-Southwell style, every such
+page at once per round) re-converges while visiting only the links of
+pages in the affected region.
+
+Rank mass still held as residual is missing from the ranks, and the
+error of the ranks is up to the L1 norm of the residual over 1 - d. A
+page therefore holds too much once it has `tolerance / N`, so that
+pushing stops with the whole residual below `tolerance`, and the ranks
+are then rescaled to sum to 1.
+
+The saved state keeps the link matrix in CSC form along with the size
+and mtime of every page file, so a later run only compares the columns
+of pages whose file changed and never rebuilds the old matrix.
+"""
+
+import itertools
+import os
+
+import numpy as np
+import scipy.sparse
+
+from crawlcache import file_stats
+from linkmatrix import (
+    MAX_ITERATIONS, TOLERANCE, LinkMatrix, power_iteration
+)
+
+STATE_NAME = ".pagerank-ranks.npz"
+
+# File stats recorded for a page with no file, never matching
+NO_FILE = -1
+
+
+def residual(links, ranks, damping_factor):
+    """
+    Return the change one power iteration would make to `ranks`.
+    """
+    return links.step(ranks, damping_factor) - ranks
+
+
+def push(links, ranks, residuals, damping_factor, tolerance=TOLERANCE,
+         max_rounds=MAX_ITERATIONS, columns=None):
+    """
+    Push residual mass until no page holds `tolerance / N` or more of
+    it, so the residual's L1 norm is below `tolerance`, then rescale
+    `ranks` to sum to 1. Updates `ranks` and `residuals` in place and
+    returns the number of links visited. `columns` is the link matrix
+    in CSC form, if the caller already has it.
+    """
+    n = links.size
+    if columns is None:
+        columns = links.matrix.tocsc()
+    visits = 0
+    for _ in range(max_rounds):
+        active = np.flatnonzero(np.abs(residuals) >= tolerance / n)
+        if len(active) == 0:
+            break
+        mass = residuals[active]
+        ranks[active] += mass
+        residuals[active] = 0
+        residuals += damping_factor * (columns[:, active] @ mass)
+        leaked = mass[links.dangling[active]].sum()
+        if leaked:
+            residuals += damping_factor * leaked / n
+        visits += int(links.out_degree[active].sum())
+    normalize(ranks, residuals, damping_factor)
+    return visits
+
+
+def normalize(ranks, residuals, damping_factor):
+    """
+    Rescale `ranks` in place to sum to 1, updating their `residuals`.
+    """
+    # The residual is d * P @ ranks - ranks plus a constant teleport term
+    total = ranks.sum()
+    teleport = (1 - damping_factor) / len(ranks)
+    ranks /= total
+    residuals -= teleport
+    residuals /= total
+    residuals += teleport
+
+
+def apply_delta(links, added=(), removed=(), columns=None):
+    """
+    Return (links, columns, changed): a LinkMatrix with the (source,
+    target) page name pairs in `added` linked and those in `removed`
+    unlinked, the same matrix in CSC form, and the indexes of the pages
+    whose links changed. Pages must already be in `links`.
+
+    Only the columns of the changed pages are rebuilt; the others are
+    copied over from `columns`, the CSC form of `links`, if given.
+    """
+    index = links.index
+    if columns is None:
+        columns = links.matrix.tocsc()
+    indptr = columns.indptr
+    indices = columns.indices
+
+    # Maps each changed page to its new set of targets
+    targets = {}
+
+    def targets_of(source):
+        if source not in targets:
+            targets[source] = set(
+                indices[indptr[source]:indptr[source + 1]].tolist()
+            )
+        return targets[source]
+
+    try:
+        for source, target in removed:
+            targets_of(index[source]).discard(index[target])
+        for source, target in added:
+            if source != target:
+                targets_of(index[source]).add(index[target])
+    except KeyError as e:
+        raise ValueError(f"Page not in corpus: {e}") from None
+
+    n = links.size
+    changed = np.array(sorted(targets), dtype=np.int64)
+    degree = np.diff(indptr)
+    new_degree = degree.astype(np.int64)
+    new_degree[changed] = [len(targets[page]) for page in changed.tolist()]
+    new_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(new_degree, out=new_indptr[1:])
+
+    # Unchanged columns keep their entries, shifted to their new offsets
+    new_indices = np.empty(new_indptr[-1], dtype=indices.dtype)
+    unchanged = np.ones(n, dtype=bool)
+    unchanged[changed] = False
+    keep = np.repeat(unchanged, degree)
+    shift = np.repeat(new_indptr[:-1] - indptr[:-1], degree)
+    new_indices[(np.arange(len(indices)) + shift)[keep]] = indices[keep]
+    for page in changed.tolist():
+        new_indices[new_indptr[page]:new_indptr[page + 1]] = sorted(
+            targets[page]
+        )
+
+    scale = np.divide(
+        1.0, new_degree, out=np.zeros(n), where=new_degree > 0
+    )
+    new_columns = scipy.sparse.csc_matrix(
+        (np.repeat(scale, new_degree), new_indices, new_indptr), shape=(n, n)
+    )
+    new_links = LinkMatrix(
+        links.pages, new_columns.tocsr(), new_degree, links.index
+    )
+    return new_links, new_columns, changed
+
+
+def residual_change(old, new, ranks, changed, damping_factor):
+    """
+    Return how the residual of `ranks` changes when the links of the
+    pages in `changed` go from the CSC link matrix `old` to `new`.
+    """
+    n = old.shape[0]
+    mass = ranks[changed]
+    change = damping_factor * (new[:, changed] @ mass - old[:, changed] @ mass)
+
+    # Mass of pages that became or stopped being dangling
+    leaked = (mass[np.diff(new.indptr)[changed] == 0].sum()
+              - mass[np.diff(old.indptr)[changed] == 0].sum())
+    if leaked:
+        change += damping_factor * leaked / n
+    return change
+
+
+def update_pagerank(links, ranks, residuals, damping_factor, added=(),
+                    removed=(), tolerance=TOLERANCE):
+    """
+    Apply a delta of added and removed links to a solved corpus.
+
+    `ranks` and `residuals` are the previous solution and its residual.
+    Returns (links, ranks, residuals, visits) for the updated corpus,
+    where `visits` counts the links the update touched.
+    """
+    columns = links.matrix.tocsc()
+    new_links, new_columns, changed = apply_delta(
+        links, added, removed, columns
+    )
+    ranks = np.array(ranks, dtype=float)
+    residuals = np.array(residuals, dtype=float)
+    residuals += residual_change(columns, new_columns, ranks, changed,
+                                 damping_factor)
+    visits = push(new_links, ranks, residuals, damping_factor, tolerance,
+                  columns=new_columns)
+    return new_links, ranks, residuals, visits
+
+
+def page_stats(pages, stats):
+    """
+    Return an array of the [size, mtime] of each page's file from a
+    `file_stats` dict, with NO_FILE for pages it lacks.
+    """
+    missing = (NO_FILE, NO_FILE)
+    values = [stats.get(page, missing) for page in pages]
+    return np.fromiter(
+        itertools.chain.from_iterable(values), np.int64, 2 * len(pages)
+    ).reshape(-1, 2)
+
+
+def changed_pages(old_stats, new_stats):
+    """
+    Return the indexes of the pages whose file may have changed.
+    """
+    return np.flatnonzero(
+        (old_stats != new_stats).any(axis=1) | (new_stats[:, 0] == NO_FILE)
+    )
+
+
+def save_state(path, pages, columns, stats, ranks, residuals, damping_factor):
+    """
+    Persist a solution with the structure of its CSC link matrix and
+    the stats of the page files it was computed from, so a later run
+    can update it.
+    """
+    temporary = f"{path}.tmp{os.getpid()}.npz"
+    np.savez(
+        temporary, pages=np.array(pages, dtype=str), stats=stats,
+        indptr=columns.indptr, indices=columns.indices,
+        ranks=ranks, residuals=residuals, damping=damping_factor
+    )
+    os.replace(temporary, path)
+
+
+def load_state(path):
+    """
+    Return (pages, columns, stats, ranks, residuals, damping_factor)
+    saved at `path`, or None if there is no usable state.
+    """
+    try:
+        with np.load(path) as state:
+            pages = state["pages"].tolist()
+            n = len(pages)
+            indptr = state["indptr"]
+            degree = np.diff(indptr)
+            scale = np.divide(
+                1.0, degree, out=np.zeros(n), where=degree > 0
+            )
+            columns = scipy.sparse.csc_matrix(
+                (np.repeat(scale, degree), state["indices"], indptr),
+                shape=(n, n)
+            )
+            return (pages, columns, state["stats"], state["ranks"],
+                    state["residuals"], float(state["damping"]))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def incremental_pagerank(directory, links, damping_factor,
+                         tolerance=TOLERANCE, stats=None):
+    """
+    Return (ranks, visits) for `links`, the current corpus of
+    `directory`, warm-starting from the state saved by the previous
+    call when it has the same pages and damping factor, and save the
+    new state. `visits` counts the links the update touched, or is
+    None after a full recomputation.
+
+    Only the links of pages whose file size or mtime changed since the
+    saved state are compared. `stats` are the `file_stats` of the
+    directory taken before it was crawled; by default they are read
+    now, which misses files changed during the crawl.
+    """
+    path = os.path.join(directory, STATE_NAME)
+    if stats is None:
+        stats = file_stats(directory)
+    current = page_stats(links.pages, stats)
+    state = load_state(path)
+    if (state is not None and state[0] == links.pages
+            and state[5] == damping_factor):
+        _, old, saved, ranks, residuals, _ = state
+        changed = changed_pages(saved, current)
+        if len(changed) == 0:
+            return ranks, 0
+        columns = links.matrix.tocsc()
+        residuals += residual_change(old, columns, ranks, changed,
+                                     damping_factor)
+        visits = push(links, ranks, residuals, damping_factor, tolerance,
+                      columns=columns)
+    else:
+        columns = links.matrix.tocsc()
+        ranks, _ = power_iteration(links, damping_factor, tolerance)
+        residuals = residual(links, ranks, damping_factor)
+
+        # Bring the residual within the bound later updates keep to
+        push(links, ranks, residuals, damping_factor, tolerance,
+             columns=columns)
+        visits = None
+    try:
+        save_state(path, links.pages, columns, current, ranks, residuals,
+                   damping_factor)
+    except OSError:
+        pass
+    return ranks, visits
@@ -0,0 +1,141 @@
+"""
+Sparse matrix PageRank engine.
+
+A corpus is turned once into a sparse column-stochastic link matrix M,
+where M[q, p] = 1 / len(corpus[p]) if page p links to page q. Pages
+with no links (dangling pages) have an empty column and are tracked
+separately, since the random surfer leaves them for any page with
+equal probability. One step of the PageRank iteration is then
+
+    rank' = d * (M @ rank + sum(rank[dangling]) / N) + (1 - d) / N
+
+which is a single sparse matrix-vector product.
+"""
+
+import numpy as np
+import scipy.sparse
+
+# Largest change in any PageRank value that counts as converged
+TOLERANCE = 0.001
+
+# Give up on convergence after this many iterations
+MAX_ITERATIONS = 1000
+
+
+class LinkMatrix():
+    """
+    Pages of a corpus interned to indexes, with their links stored as
+    a sparse column-stochastic matrix in CSR form (rows are targets).
+    """
+
+    def __init__(self, pages, matrix, out_degree, index=None):
+        self.pages = pages
+        if index is None:
+            index = {page: i for i, page in enumerate(pages)}
+        self.index = index
+        self.matrix = matrix
+        self.out_degree = out_degree
+        self.dangling = out_degree == 0
+
+    @property
+    def size(self):
+        return len(self.pages)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the matrix for a `crawl` style dict of page -> linked pages.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources = []
+        targets = []
+        for page in pages:
+            for link in corpus[page]:
+                sources.append(index[page])
+                targets.append(index[link])
+        return cls.from_edges(pages, sources, targets)
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Build the matrix from page names and parallel sequences of
+        (source, target) page indexes. Self-links and repeated links
+        are dropped, as `crawl` does.
+        """
+        n = len(pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        keep = sources != targets
+        sources = sources[keep]
+        targets = targets[keep]
+
+        # One entry per distinct link, then scale each column by 1/out-degree
+        adjacency = scipy.sparse.csr_matrix(
+            (np.ones(len(sources)), (targets, sources)), shape=(n, n)
+        )
+        adjacency.sum_duplicates()
+        adjacency.data[:] = 1
+        out_degree = np.asarray(adjacency.sum(axis=0)).ravel()
+        scale = np.divide(
+            1.0, out_degree, out=np.zeros(n), where=out_degree > 0
+        )
+        matrix = scipy.sparse.csr_matrix(adjacency @ scipy.sparse.diags(scale))
+        return cls(list(pages), matrix, out_degree.astype(np.int64))
+
+    def edges(self):
+        """
+        Return (sources, targets) arrays of the links as page indexes.
+        """
+        entries = self.matrix.tocoo()
+        return entries.col.astype(np.int64), entries.row.astype(np.int64)
+
+    def step(self, ranks, damping_factor, teleport=None):
+        """
+        Return one PageRank iteration applied to the vector `ranks`.
+        `teleport` is the distribution random jumps land on, uniform
+        by default; surfers on dangling pages jump the same way.
+        """
+        n = self.size
+        leaked = ranks[self.dangling].sum()
+        result = self.matrix @ ranks
+        if teleport is None:
+            result += leaked / n
+            result *= damping_factor
+            result += (1 - damping_factor) / n
+        else:
+            result *= damping_factor
+            result += (damping_factor * leaked + 1 - damping_factor) * teleport
+        return result
+
+    def to_dict(self, ranks):
+        """
+        Return a rank vector as a dict of page -> PageRank value.
+        """
+        return {page: float(rank) for page, rank in zip(self.pages, ranks)}
+
+
+def as_links(corpus):
+    """
+    Return `corpus` as a LinkMatrix, converting a `crawl` style dict.
+    """
+    if isinstance(corpus, LinkMatrix):
+        return corpus
+    return LinkMatrix.from_corpus(corpus)
+
+
+def power_iteration(links, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, start=None):
+    """
+    Return (ranks, iterations) from iterating `links` from `start`
+    (uniform by default) until no value changes by `tolerance` or more.
+    """
+    n = links.size
+    ranks = np.full(n, 1 / n) if start is None else np.asarray(start, float)
+    for iteration in range(1, max_iterations + 1):
+        new_ranks = links.step(ranks, damping_factor)
+        change = np.abs(new_ranks - ranks).max()
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    return ranks, iteration
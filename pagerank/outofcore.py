@@ -0,0 +1,283 @@
+"""
+Out-of-core PageRank for link graphs larger than memory.
+
+Links are appended to raw int32 files on disk as they are found, then
+bucketed by target with a counting sort into a memory-mapped edge
+store: the source of every link as int32, sorted by target and then
+source, with int64 row offsets per target (CSR with targets as rows),
+plus each page's out-degree. Self-links and repeated links are dropped
+one block of rows at a time.
+
+Power iteration then streams over the store a block of rows at a time,
+so besides the two float64 rank vectors it only ever holds one block of
+at most EDGE_BLOCK links, whatever the number of links. Building the
+store holds a few int64 arrays per page, never per link.
+
+A store is a directory of
+
+    meta.json       {"version", "pages", "links"}
+    pages.txt       page names, one per line, in index order
+    indptr.i64      row offsets of each target page's links
+    sources.i32     source page of each link
+    degree.i32      out-degree of each page
+"""
+
+import json
+import os
+from array import array
+
+import numpy as np
+
+from crawler import list_pages, scan_pages
+from linkmatrix import MAX_ITERATIONS, TOLERANCE
+
+VERSION = 1
+
+# Links processed at a time
+EDGE_BLOCK = 1 << 22
+
+# Pages processed at a time by per-page passes
+PAGE_BLOCK = 1 << 20
+
+
+class EdgeWriter():
+    """
+    Appends links to the raw files of a store being built; `close`
+    sorts them into an EdgeStore.
+    """
+
+    def __init__(self, directory, pages):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.pages = pages
+        self.sources = open(os.path.join(directory, "sources.raw"), "wb")
+        self.targets = open(os.path.join(directory, "targets.raw"), "wb")
+
+    def add(self, sources, targets):
+        """
+        Append links given as parallel sequences of page indexes.
+        """
+        np.asarray(sources, dtype=np.int32).tofile(self.sources)
+        np.asarray(targets, dtype=np.int32).tofile(self.targets)
+
+    def close(self):
+        self.sources.close()
+        self.targets.close()
+        build_store(self.directory, self.pages)
+        return EdgeStore(self.directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self.sources.closed:
+            self.sources.close()
+            self.targets.close()
+
+
+class EdgeStore():
+    """
+    A memory-mapped edge store written by `build_store`.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != VERSION:
+            raise ValueError(f"Unsupported edge store: {directory}")
+        self.size = meta["pages"]
+        self.links = meta["links"]
+        self.indptr = open_array(directory, "indptr.i64", np.int64)
+        self.sources = open_array(directory, "sources.i32", np.int32)
+        self.degree = open_array(directory, "degree.i32", np.int32)
+        self.blocks = row_blocks(self.indptr)
+
+    def pages(self):
+        """
+        Yield the page names in index order.
+        """
+        with open(os.path.join(self.directory, "pages.txt"),
+                  encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+
+def open_array(directory, name, dtype):
+    path = os.path.join(directory, name)
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def row_blocks(indptr):
+    """
+    Return (start, end) row ranges holding at most EDGE_BLOCK links
+    each, or a single row if it alone holds more.
+    """
+    rows = len(indptr) - 1
+    blocks = []
+    start = 0
+    while start < rows:
+        limit = indptr[start] + EDGE_BLOCK
+        end = max(start + 1, int(np.searchsorted(indptr, limit, "right")) - 1)
+        end = min(end, rows)
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+
+def build_store(directory, pages):
+    """
+    Sort the raw links appended by an EdgeWriter in `directory` into
+    an edge store, and remove the raw files.
+    """
+    n = len(pages)
+    raw_sources = open_array(directory, "sources.raw", np.int32)
+    raw_targets = open_array(directory, "targets.raw", np.int32)
+    total = len(raw_targets)
+
+    # Counting sort by target into a scratch file
+    counts = np.zeros(n, dtype=np.int64)
+    for start in range(0, total, EDGE_BLOCK):
+        targets = raw_targets[start:start + EDGE_BLOCK]
+        found, found_counts = np.unique(targets, return_counts=True)
+        counts[found] += found_counts
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    del counts
+
+    scratch_path = os.path.join(directory, "grouped.tmp")
+    grouped = create_array(scratch_path, np.int32, total)
+    filled = indptr[:-1].copy()
+    for start in range(0, total, EDGE_BLOCK):
+        targets = np.asarray(raw_targets[start:start + EDGE_BLOCK])
+        sources = np.asarray(raw_sources[start:start + EDGE_BLOCK])
+        order = np.argsort(targets, kind="stable")
+        targets = targets[order]
+        found, first, found_counts = np.unique(
+            targets, return_index=True, return_counts=True
+        )
+        within = np.arange(len(targets)) - np.repeat(first, found_counts)
+        grouped[filled[targets] + within] = sources[order]
+        filled[found] += found_counts
+    del filled, raw_sources, raw_targets
+
+    # Sort each row by source, dropping self-links and repeats
+    degree = np.zeros(n, dtype=np.int64)
+    row_counts = np.zeros(n, dtype=np.int64)
+    links = 0
+    with open(os.path.join(directory, "sources.i32"), "wb") as out:
+        for start, end in row_blocks(indptr):
+            sources = np.asarray(grouped[indptr[start]:indptr[end]])
+            rows = np.repeat(
+                np.arange(start, end, dtype=np.int64),
+                np.diff(indptr[start:end + 1])
+            )
+            order = np.lexsort((sources, rows))
+            sources = sources[order]
+            rows = rows[order]
+            keep = sources != rows
+            keep[1:] &= (sources[1:] != sources[:-1]) | (rows[1:] != rows[:-1])
+            sources = sources[keep]
+            rows = rows[keep]
+            sources.tofile(out)
+            links += len(sources)
+            row_counts[start:end] = np.bincount(
+                rows - start, minlength=end - start
+            )
+            found, found_counts = np.unique(sources, return_counts=True)
+            degree[found] += found_counts
+    del grouped
+    os.remove(scratch_path)
+
+    np.cumsum(row_counts, out=indptr[1:])
+    indptr.tofile(os.path.join(directory, "indptr.i64"))
+    degree.astype(np.int32).tofile(os.path.join(directory, "degree.i32"))
+    with open(os.path.join(directory, "pages.txt"), "w",
+              encoding="utf-8") as f:
+        for page in pages:
+            f.write(f"{page}\n")
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({"version": VERSION, "pages": n, "links": links}, f)
+    os.remove(os.path.join(directory, "sources.raw"))
+    os.remove(os.path.join(directory, "targets.raw"))
+
+
+def create_array(path, dtype, length):
+    if length == 0:
+        open(path, "wb").close()
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="w+", shape=(length,))
+
+
+def step(store, ranks, new_ranks, damping_factor):
+    """
+    Write one PageRank iteration of `ranks` into `new_ranks`, streaming
+    the store a block of rows at a time.
+    """
+    n = store.size
+    leaked = 0.0
+    for start in range(0, n, PAGE_BLOCK):
+        dangling = store.degree[start:start + PAGE_BLOCK] == 0
+        leaked += ranks[start:start + PAGE_BLOCK][dangling].sum()
+
+    indptr = store.indptr
+    for start, end in store.blocks:
+        sources = np.asarray(store.sources[indptr[start]:indptr[end]])
+        shares = ranks[sources] / store.degree[sources]
+        rows = np.repeat(
+            np.arange(end - start), np.diff(indptr[start:end + 1])
+        )
+        new_ranks[start:end] = np.bincount(
+            rows, weights=shares, minlength=end - start
+        )
+    new_ranks += leaked / n
+    new_ranks *= damping_factor
+    new_ranks += (1 - damping_factor) / n
+
+
+def max_change(ranks, new_ranks):
+    return max(
+        (np.abs(new_ranks[start:start + PAGE_BLOCK]
+                - ranks[start:start + PAGE_BLOCK]).max()
+         for start in range(0, len(ranks), PAGE_BLOCK)),
+        default=0.0
+    )
+
+
+def outofcore_pagerank(store, damping_factor, tolerance=TOLERANCE,
+                       max_iterations=MAX_ITERATIONS):
+    """
+    Return (ranks, iterations) from iterating the EdgeStore `store`
+    from uniform ranks until no value changes by `tolerance` or more.
+    """
+    n = store.size
+    ranks = np.full(n, 1 / n)
+    new_ranks = np.empty(n)
+    for iteration in range(1, max_iterations + 1):
+        step(store, ranks, new_ranks, damping_factor)
+        change = max_change(ranks, new_ranks)
+        ranks, new_ranks = new_ranks, ranks
+        if change < tolerance:
+            break
+    return ranks, iteration
+
+
+def crawl_store(directory, store_directory, workers=1, progress=False):
+    """
+    Crawl `directory` straight into an edge store in `store_directory`,
+    writing links out a block at a time, and return the EdgeStore.
+    """
+    pages = list_pages(directory)
+    with EdgeWriter(store_directory, pages) as writer:
+        sources = array("i")
+        targets = array("i")
+        for source, links in scan_pages(directory, pages, workers, progress):
+            sources.extend(array("i", [source]) * len(links))
+            targets.extend(links)
+            if len(targets) >= EDGE_BLOCK:
+                writer.add(sources, targets)
+                del sources[:], targets[:]
+        writer.add(sources, targets)
+        return writer.close()
@@ -1,21 +1,112 @@
+import argparse
 import os
-import random
 import re
 import sys
 
+from crawlcache import file_stats, incremental_crawl
+from crawler import crawl_matrix
+from incremental import incremental_pagerank
+from linkmatrix import TOLERANCE, LinkMatrix, as_links
+from outofcore import crawl_store, outofcore_pagerank
+from parallel import parallel_power_iteration
+from sampler import visit_counts
+from solvers import NORMS, SOLVERS, solve
+
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        usage="python pagerank.py corpus [--workers N] [--progress] [--cache]"
+              " [--incremental] [--solver NAME] [--stop NORM] [--report]"
+              " [--out-of-core DIR]"
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes scanning the corpus files, and iterating with "
+             "the power solver (default: 1)"
+    )
+    parser.add_argument(
+        "--progress", action="store_true",
+        help="report crawl throughput on stderr"
+    )
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="only re-parse pages changed since the last cached crawl"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="update the ranks saved by the last run for the changed links"
+    )
+    parser.add_argument(
+        "--solver", choices=sorted(SOLVERS), default="power",
+        help="iteration method (default: power)"
+    )
+    parser.add_argument(
+        "--stop", choices=sorted(NORMS), default="max",
+        help="norm of an iteration's change to stop on (default: max)"
+    )
+    parser.add_argument(
+        "--report", action="store_true",
+        help="report each iteration's change and timing on stderr"
+    )
+    parser.add_argument(
+        "--out-of-core", metavar="DIR",
+        help="store the links on disk in DIR and only iterate, keeping "
+             "just the rank vectors in memory"
+    )
+    args = parser.parse_args()
+    if args.out_of_core:
+        store = crawl_store(
+            args.corpus, args.out_of_core, args.workers, args.progress
+        )
+        ranks, _ = outofcore_pagerank(store, DAMPING)
+        print(f"PageRank Results from Iteration")
+        for page, rank in zip(store.pages(), ranks):
+            print(f"  {page}: {rank:.4f}")
+        return
+    # Taken before crawling, so files changed meanwhile count as changed
+    stats = file_stats(args.corpus) if args.incremental else None
+    if args.cache:
+        graph, counts = incremental_crawl(args.corpus, args.workers)
+        if args.progress:
+            print(
+                f"{counts['parsed']} pages parsed, {counts['reused']} cached, "
+                f"{counts['removed']} removed", file=sys.stderr
+            )
+        corpus = LinkMatrix.from_corpus(graph.corpus)
+    else:
+        corpus = crawl_matrix(args.corpus, args.workers, args.progress)
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    if args.incremental:
+        ranks, visits = incremental_pagerank(
+            args.corpus, corpus, DAMPING, stats=stats
+        )
+        if args.progress:
+            if visits is None:
+                print("No saved ranks to update, computed in full",
+                      file=sys.stderr)
+            else:
+                print(f"{visits} links visited updating saved ranks",
+                      file=sys.stderr)
+        ranks = corpus.to_dict(ranks)
+    else:
+        history = []
+        ranks = iterate_pagerank(
+            corpus, DAMPING, solver=args.solver, stop=args.stop,
+            history=history,
+            workers=args.workers if args.solver == "power" else 1
+        )
+        if args.report:
+            for iteration, (change, seconds) in enumerate(history, 1):
+                print(f"{args.solver} iteration {iteration}: "
+                      f"{args.stop} change {change:.3e}, {seconds:.4f}s",
+                      file=sys.stderr)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -74,7 +165,7 @@ def transition_model(corpus, page, damping_factor):
                 trans_dict[key] = distrib
     return trans_dict
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -82,23 +173,16 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    Many surfers walk the corpus at once (see `sampler`); pass `seed`
+    for reproducible results. `corpus` may also be a LinkMatrix.
     """
-    rankings = {}
-    storage = []
-    choice = random.choice(list(corpus.keys()))
-    storage.append(choice)
-    for i in range(n - 1):
-        a = transition_model(corpus, choice, damping_factor)
-        keys = list(corpus.keys())
-        weights = [a[i] for i in keys]
-        choice = random.choices(keys, weights, k=1)[0]
-        storage.append(choice)
-    for key in corpus.keys():
-        number = storage.count(key) / len(storage)
-        rankings[key] = number
-    return rankings
-
-def iterate_pagerank(corpus, damping_factor):
+    links = as_links(corpus)
+    counts = visit_counts(links, damping_factor, n, seed=seed)
+    return links.to_dict(counts / n)
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                     solver="power", stop="max", history=None, workers=1):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -106,30 +190,31 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
-    """
-    old_dict = {}
-    new_dict = {}
-    N = len(corpus.keys())
-    for key in corpus:
-        old_dict[key] = 1 / N
-    while True:
-        for current_p in corpus:
-            rank = 0
-            for p_that_linked in corpus:
-                if current_p in corpus[p_that_linked]:
-                    rank = rank + old_dict[p_that_linked] / len(corpus[p_that_linked])
-                if len(corpus[p_that_linked]) == 0:
-                    rank = rank + old_dict[p_that_linked] / len(corpus)
-            rank = rank * damping_factor
-            rank = rank + (1 - damping_factor) / N
-            new_dict[current_p] = rank
-        change = max([abs(old_dict[x] - new_dict[x]) for x in old_dict])
-        if change < 0.001:
-            break
-        else:
-            old_dict = new_dict.copy()
-    return old_dict
 
+    The corpus is converted once to a sparse link matrix, and each
+    update is one matrix-vector product; iteration stops when no
+    value changes by `tolerance` or more. `corpus` may also be a
+    LinkMatrix.
+
+    `solver` picks the iteration method and `stop` the norm of the
+    change to stop on (see `solvers`); a list passed as `history` is
+    extended with each iteration's (change, seconds).
+
+    With `workers` above 1, the power solver runs on that many
+    processes (see `parallel`), giving exactly the same values.
+    """
+    links = as_links(corpus)
+    if workers > 1:
+        if solver != "power":
+            raise ValueError(f"The {solver} solver cannot run in parallel")
+        ranks, steps = parallel_power_iteration(
+            links, damping_factor, workers, tolerance, stop
+        )
+    else:
+        ranks, steps = solve(links, damping_factor, solver, tolerance, stop)
+    if history is not None:
+        history.extend(steps)
+    return links.to_dict(ranks)
 
 if __name__ == "__main__":
     main()
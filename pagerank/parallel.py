@@ -0,0 +1,175 @@
+"""
+Multi-core power iteration over a partitioned link matrix.
+
+The rows of the link matrix (the pages links lead to) are split into
+one contiguous range per worker process, balanced by number of links.
+The two rank vectors live in shared memory. Each iteration, the main
+process sends every worker which vector is current and the rank on
+dangling pages; each worker computes its rows of the new vector from
+the whole old one, writes them in place and replies with its largest
+change.
+
+Each page's new value is computed by exactly one worker from its whole
+matrix row, with the same operations in the same order as
+`LinkMatrix.step`, and the sums over all pages (the rank on dangling
+pages and an L1 change) are taken by the main process. The ranks are
+therefore bit-for-bit those of the serial power iteration, whatever the
+number of workers.
+
+The main process waits on the workers' pipes together with their
+process sentinels, so a worker dying in any way raises an error rather
+than leaving it waiting forever. Workers stop at their next wait if
+the main process dies.
+"""
+
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from linkmatrix import MAX_ITERATIONS, TOLERANCE
+
+# Seconds an idle worker waits between checks that its parent lives
+POLL = 1.0
+
+
+def partition(indptr, parts):
+    """
+    Return `parts` contiguous (start, end) row ranges with about the
+    same number of links each.
+    """
+    rows = len(indptr) - 1
+    targets = np.linspace(0, indptr[-1], parts + 1)
+    bounds = np.searchsorted(indptr, targets).clip(0, rows)
+    bounds[0] = 0
+    bounds[-1] = rows
+    bounds = np.maximum.accumulate(bounds)
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def worker(name, n, start, end, rows, damping_factor, connection):
+    """
+    Compute rows `start` to `end` of each iteration asked for over
+    `connection`, until sent None or orphaned.
+    """
+    parent = os.getppid()
+    memory = shared_memory.SharedMemory(name=name)
+    buffers = np.ndarray((2, n), dtype=np.float64, buffer=memory.buf)
+    try:
+        while True:
+            while not connection.poll(POLL):
+                if os.getppid() != parent:
+                    return
+            message = connection.recv()
+            if message is None:
+                return
+            current, leaked = message
+            ranks = buffers[current]
+            result = rows @ ranks
+            result += leaked / n
+            result *= damping_factor
+            result += (1 - damping_factor) / n
+            buffers[1 - current, start:end] = result
+            connection.send(
+                float(np.abs(result - ranks[start:end]).max())
+                if end > start else 0.0
+            )
+    except (EOFError, ConnectionError):
+        # The main process is gone
+        pass
+    finally:
+        del buffers
+        memory.close()
+
+
+def gather(connections, processes):
+    """
+    Return every worker's reply to the current iteration, raising
+    RuntimeError as soon as a worker exits.
+    """
+    owners = dict(zip(connections, processes))
+    sentinels = {process.sentinel: process for process in processes}
+    replies = {}
+    while len(replies) < len(connections):
+        pending = [c for c in connections if c not in replies]
+        for ready in wait(pending + list(sentinels)):
+            process = sentinels.get(ready)
+            if process is None:
+                try:
+                    replies[ready] = ready.recv()
+                    continue
+                except (EOFError, ConnectionError):
+                    process = owners[ready]
+            process.join()
+            raise RuntimeError(
+                f"PageRank worker {process.pid} died "
+                f"(exit code {process.exitcode})"
+            )
+    return [replies[connection] for connection in connections]
+
+
+def parallel_power_iteration(links, damping_factor, workers,
+                             tolerance=TOLERANCE, stop="max",
+                             max_iterations=MAX_ITERATIONS):
+    """
+    Return (ranks, history) from power iteration on `workers` processes,
+    as `solvers.solve` with the power solver. `stop` is "max" or "l1".
+    """
+    if stop not in ("max", "l1"):
+        raise ValueError(f"Unknown stop norm: {stop}")
+    n = links.size
+    memory = shared_memory.SharedMemory(create=True, size=2 * n * 8)
+    buffers = np.ndarray((2, n), dtype=np.float64, buffer=memory.buf)
+    connections = []
+    processes = []
+    try:
+        for start, end in partition(links.matrix.indptr, workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=worker, daemon=True, args=(
+                    memory.name, n, start, end, links.matrix[start:end],
+                    damping_factor, worker_connection
+                )
+            )
+            process.start()
+            worker_connection.close()
+            connections.append(connection)
+            processes.append(process)
+
+        buffers[0] = 1 / n
+        current = 0
+        history = []
+        begin = time.perf_counter()
+        for _ in range(max_iterations):
+            leaked = buffers[current][links.dangling].sum()
+            for connection in connections:
+                connection.send((current, leaked))
+            changes = gather(connections, processes)
+            if stop == "max":
+                change = max(changes)
+            else:
+                change = np.abs(buffers[1 - current] - buffers[current]).sum()
+            current = 1 - current
+            history.append((float(change), time.perf_counter() - begin))
+            if change < tolerance:
+                break
+        ranks = buffers[current].copy()
+        for connection in connections:
+            connection.send(None)
+        for process in processes:
+            process.join()
+    except BaseException:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        raise
+    finally:
+        for connection in connections:
+            connection.close()
+        del buffers
+        memory.close()
+        memory.unlink()
+    return ranks, history
@@ -0,0 +1,106 @@
+"""
+Vectorized Monte Carlo PageRank sampling.
+
+Thousands of independent random surfers advance together, one NumPy
+step at a time, and every page they land on is tallied in a count
+array. Each step a surfer either follows a uniformly chosen link of
+its page (probability `damping_factor`, unless the page has none) or
+jumps to a page drawn from the teleport distribution.
+
+Because a page's links are equally likely, picking one is a single
+offset into the page's row of the outgoing-link CSR arrays; alias
+tables are used for the teleport distribution, which need not be
+uniform.
+"""
+
+import numpy as np
+
+# Surfers advanced together
+WALKERS = 10000
+
+# Fewest steps each surfer takes, so the starting pages do not bias
+# the counts; small sample sizes use fewer surfers instead
+MIN_STEPS = 100
+
+
+class AliasTable():
+    """
+    Walker's alias method: O(1) draws from a fixed discrete distribution.
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        n = len(weights)
+        scaled = weights * (n / weights.sum())
+        self.probability = np.ones(n)
+        self.alias = np.arange(n)
+
+        small = [i for i in range(n) if scaled[i] < 1]
+        large = [i for i in range(n) if scaled[i] >= 1]
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            self.probability[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1 - scaled[low]
+            if scaled[high] < 1:
+                small.append(high)
+            else:
+                large.append(high)
+
+    def sample(self, rng, size):
+        """
+        Return `size` independent draws as an array of indexes.
+        """
+        columns = rng.integers(0, len(self.probability), size)
+        keep = rng.random(size) < self.probability[columns]
+        return np.where(keep, columns, self.alias[columns])
+
+
+def out_links(links):
+    """
+    Return (indptr, indices) CSR arrays of each page's outgoing links.
+    """
+    outgoing = links.matrix.T.tocsr()
+    return outgoing.indptr, outgoing.indices
+
+
+def visit_counts(links, damping_factor, n, walkers=WALKERS, seed=None,
+                 teleport=None):
+    """
+    Return an array counting the visits to each page over `n` samples
+    taken by `walkers` surfers starting at random pages. `seed` makes
+    runs reproducible; `teleport` weights the pages random jumps land
+    on, uniform by default.
+    """
+    rng = np.random.default_rng(seed)
+    size = links.size
+    indptr, indices = out_links(links)
+    degree = np.diff(indptr)
+    jumps = None if teleport is None else AliasTable(teleport)
+
+    def jump(count):
+        if jumps is None:
+            return rng.integers(0, size, count)
+        return jumps.sample(rng, count)
+
+    walkers = max(1, min(walkers, n // MIN_STEPS))
+    counts = np.zeros(size, dtype=np.int64)
+    positions = rng.integers(0, size, walkers)
+    taken = 0
+    while True:
+        remaining = n - taken
+        if remaining <= walkers:
+            counts += np.bincount(positions[:remaining], minlength=size)
+            return counts
+        counts += np.bincount(positions, minlength=size)
+        taken += walkers
+
+        # Surfers on pages with links follow one with the damping
+        # probability; the rest jump
+        follow = (rng.random(walkers) < damping_factor) & (degree[positions] > 0)
+        following = positions[follow]
+        choice = (rng.random(len(following)) * degree[following]).astype(np.int64)
+        moved = jump(walkers)
+        moved[follow] = indices[indptr[following] + choice]
+        positions = moved
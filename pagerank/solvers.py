@@ -0,0 +1,182 @@
+"""
+Selectable PageRank solvers.
+
+Every solver is a generator that takes the link matrix, damping factor
+and a starting rank vector and yields (ranks, change) after each
+iteration, where `change` is how far that iteration moved the vector.
+`solve` drives any of them, measures each change with the chosen stop
+norm and records it with the elapsed time, so solvers can be compared
+on a corpus.
+
+    power      Plain power (Jacobi) iteration, as `power_iteration`.
+    gauss-seidel
+               Sweeps the rows a block at a time, using the values
+               already updated in the sweep for the blocks after them.
+    aitken     Power iteration, with Aitken's delta-squared extrapolation
+               of every value from the last three iterates periodically.
+    quadratic  Power iteration, with quadratic extrapolation from the
+               last four iterates periodically (Kamvar et al.).
+
+Extrapolations are only kept when they lower the residual, so the two
+accelerated solvers never need more iterations than power iteration;
+each attempt costs one extra matrix-vector product.
+"""
+
+import time
+from collections import deque
+from itertools import count
+
+import numpy as np
+
+from linkmatrix import MAX_ITERATIONS, TOLERANCE
+
+# Row blocks per Gauss-Seidel sweep; each block is one sparse product
+BLOCKS = 64
+
+# Power iterations between extrapolations
+PERIOD = 10
+
+
+def power(links, damping_factor, ranks):
+    while True:
+        new_ranks = links.step(ranks, damping_factor)
+        yield new_ranks, new_ranks - ranks
+        ranks = new_ranks
+
+
+def gauss_seidel(links, damping_factor, ranks, blocks=BLOCKS):
+    n = links.size
+    ranks = ranks.copy()
+    bounds = np.unique(np.linspace(0, n, min(blocks, n) + 1).astype(np.int64))
+    rows = [
+        (start, end, links.matrix[start:end])
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+    dangling = links.dangling
+    while True:
+        old = ranks.copy()
+        leaked = ranks[dangling].sum()
+        for start, end, block in rows:
+            new = block @ ranks
+            new += leaked / n
+            new *= damping_factor
+            new += (1 - damping_factor) / n
+            leaked += (new - ranks[start:end])[dangling[start:end]].sum()
+            ranks[start:end] = new
+        ranks /= ranks.sum()
+        yield ranks, ranks - old
+
+
+def aitken(links, damping_factor, ranks, period=PERIOD):
+    return extrapolating(links, damping_factor, ranks, aitken_extrapolation,
+                         3, period)
+
+
+def quadratic(links, damping_factor, ranks, period=PERIOD):
+    return extrapolating(links, damping_factor, ranks,
+                         quadratic_extrapolation, 4, period)
+
+
+def extrapolating(links, damping_factor, ranks, extrapolate, depth, period):
+    """
+    Power iteration that extrapolates from the last `depth` iterates
+    every `period` iterations. The extrapolated vector replaces the
+    next iterate only if its residual (the change one step makes to
+    it) is smaller in L1 than that of the last iterate, so an
+    extrapolation never sets the iteration back; trying one costs an
+    extra step.
+    """
+    iterates = deque(maxlen=depth)
+    trial = None
+    for iteration in count(1):
+        new_ranks = links.step(ranks, damping_factor)
+        change = new_ranks - ranks
+        if trial is not None:
+            candidate, stepped = trial
+            trial = None
+            candidate_change = stepped - candidate
+            if np.abs(candidate_change).sum() < np.abs(change).sum():
+                new_ranks, change = stepped, candidate_change
+        yield new_ranks, change
+        ranks = new_ranks
+        iterates.append(ranks)
+        if iteration % period == 0 and len(iterates) == depth:
+            candidate = extrapolate(*iterates)
+            if candidate is not None:
+                trial = candidate, links.step(candidate, damping_factor)
+            iterates.clear()
+
+
+def aitken_extrapolation(first, second, third):
+    """
+    Return Aitken's delta-squared extrapolation of every value.
+    """
+    curvature = third - 2 * second + first
+    usable = curvature != 0
+    extrapolated = third.copy()
+    extrapolated[usable] -= (third - second)[usable] ** 2 / curvature[usable]
+    return normalized(extrapolated)
+
+
+def quadratic_extrapolation(base, first, second, third):
+    """
+    Return the quadratic extrapolation of Kamvar et al.
+    """
+    differences = np.column_stack([first - base, second - base])
+    gamma1, gamma2 = -np.linalg.lstsq(
+        differences, third - base, rcond=None
+    )[0]
+    return normalized(
+        (gamma1 + gamma2 + 1) * first + (gamma2 + 1) * second + third
+    )
+
+
+def normalized(extrapolated):
+    """
+    Return `extrapolated` clipped to non-negative values and rescaled to
+    sum to 1, or None if nothing is left of it.
+    """
+    extrapolated = np.maximum(extrapolated, 0)
+    total = extrapolated.sum()
+    if not np.isfinite(total) or total <= 0:
+        return None
+    return extrapolated / total
+
+
+SOLVERS = {
+    "power": power,
+    "gauss-seidel": gauss_seidel,
+    "aitken": aitken,
+    "quadratic": quadratic
+}
+
+# Norms of an iteration's change that `solve` can stop on
+NORMS = {
+    "max": lambda change: np.abs(change).max(),
+    "l1": lambda change: np.abs(change).sum()
+}
+
+
+def solve(links, damping_factor, solver="power", tolerance=TOLERANCE,
+          stop="max", max_iterations=MAX_ITERATIONS):
+    """
+    Return (ranks, history) from running `solver` from uniform ranks
+    until the `stop` norm of an iteration's change is below `tolerance`.
+    `history` lists (change, seconds) after each iteration, the seconds
+    counted from the start.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver: {solver}")
+    if stop not in NORMS:
+        raise ValueError(f"Unknown stop norm: {stop}")
+    norm = NORMS[stop]
+    n = links.size
+    history = []
+    start = time.perf_counter()
+    iterations = SOLVERS[solver](links, damping_factor, np.full(n, 1 / n))
+    for ranks, change in iterations:
+        history.append((float(norm(change)), time.perf_counter() - start))
+        if history[-1][0] < tolerance or len(history) >= max_iterations:
+            break
+    iterations.close()
+    return ranks, history
@@ -0,0 +1,45 @@
+import os
+import random
+
+import pytest
+
+from crawler import crawl_matrix
+from incremental import incremental_pagerank
+from pagerank import DAMPING, iterate_pagerank
+
+PAGES = 60
+
+
+def write_page(directory, page, targets):
+    with open(os.path.join(directory, f"{page}.html"), "w") as f:
+        f.write("<html><body>")
+        for target in targets:
+            f.write(f'<a href="{target}.html">{target}</a>')
+        f.write("</body></html>")
+
+
+def write_corpus(directory, rng):
+    for page in range(PAGES):
+        write_page(directory, page, rng.sample(range(PAGES), rng.randint(0, 6)))
+
+
+@pytest.mark.parametrize("tolerance", [0.001, 1e-8])
+def test_incremental_matches_full_recompute(tmp_path, tolerance):
+    rng = random.Random(0)
+    write_corpus(tmp_path, rng)
+    incremental_pagerank(tmp_path, crawl_matrix(tmp_path), DAMPING, tolerance)
+
+    # Relink a few pages, with more links so their size changes too
+    for page in rng.sample(range(PAGES), 5):
+        write_page(tmp_path, page, rng.sample(range(PAGES), 8))
+    links = crawl_matrix(tmp_path)
+    ranks, visits = incremental_pagerank(tmp_path, links, DAMPING, tolerance)
+    assert visits is not None
+
+    updated = links.to_dict(ranks)
+    exact = iterate_pagerank(links, DAMPING, tolerance=1e-14)
+    full = iterate_pagerank(links, DAMPING, tolerance=tolerance)
+    assert sum(updated.values()) == pytest.approx(1)
+    error = max(abs(updated[page] - exact[page]) for page in exact)
+    full_error = max(abs(full[page] - exact[page]) for page in exact)
+    assert error <= full_error